@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class ActionPipeline:
+    """Executa os efeitos colaterais de uma ação de moderação em paralelo
+    
+    Cada etapa é uma função que retorna uma corrotina. `after` apenas
+    ordena (a etapa espera as outras terminarem, com ou sem erro);
+    `requires` também exige que elas tenham dado certo, senão a etapa é
+    pulada. Erros de etapas opcionais são registrados; o erro de uma etapa
+    obrigatória é relançado ao final de `run`.
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self._steps = {}  # nome -> (fábrica, after, requires, obrigatória)
+        self.timings = {}
+        self.errors = {}
+        self.skipped = []
+    
+    def add(self, name, factory, after=(), requires=(), required=False):
+        self._steps[name] = (factory, tuple(after), tuple(requires), required)
+        return self
+    
+    async def run(self):
+        tasks = {}
+        
+        async def run_step(name, factory, after, requires):
+            for dependency in after + requires:
+                ok = await tasks[dependency]
+                if not ok and dependency in requires:
+                    self.skipped.append(name)
+                    return False
+            
+            start = time.perf_counter()
+            try:
+                await factory()
+                return True
+            except Exception as e:
+                self.errors[name] = e
+                return False
+            finally:
+                self.timings[name] = time.perf_counter() - start
+        
+        # Todas as tarefas existem antes de qualquer etapa aguardar outra
+        start = time.perf_counter()
+        for name, (factory, after, requires, _) in self._steps.items():
+            tasks[name] = asyncio.ensure_future(run_step(name, factory, after, requires))
+        await asyncio.gather(*tasks.values())
+        self.timings['total'] = time.perf_counter() - start
+        
+        logger.debug(f"{self.name}: " + ' '.join(
+            f"{step}={elapsed * 1000:.0f}ms" for step, elapsed in self.timings.items()
+        ))
+        
+        failure = None
+        for name, error in self.errors.items():
+            if self._steps[name][3]:
+                failure = failure or error
+            else:
+                logger.warning(f"{self.name}: etapa '{name}' falhou: {error}")
+        if failure:
+            raise failure
@@ -0,0 +1,245 @@
+import discord
+from discord.ext import commands
+from collections import OrderedDict, deque
+import time
+import logging
+from config import Config
+from moderation import parse_duration
+from guild_settings import setup_settings
+
+logger = logging.getLogger(__name__)
+
+class UserState:
+    """Janelas deslizantes de um usuário (listas curtas de tamanho fixo)"""
+    __slots__ = ('times', 'hashes', 'punished_until', 'last_seen')
+    
+    def __init__(self, now):
+        self.times = []
+        self.hashes = []
+        self.punished_until = 0.0
+        self.last_seen = now
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+    
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+    
+    def take(self, capacity, rate, now):
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class SpamDetector:
+    """Detecção de flood, mensagens repetidas e raids com memória limitada
+    
+    Usuários inativos há mais de `idle_ttl` segundos (ou além de
+    `max_users`) são descartados do início da OrderedDict.
+    """
+    
+    def __init__(self):
+        self.flood_count = Config.ANTISPAM_FLOOD_COUNT
+        self.flood_window = Config.ANTISPAM_FLOOD_WINDOW
+        self.duplicate_count = Config.ANTISPAM_DUPLICATE_COUNT
+        self.duplicate_window = Config.ANTISPAM_DUPLICATE_WINDOW
+        self.channel_capacity = Config.ANTISPAM_CHANNEL_BURST
+        self.channel_rate = Config.ANTISPAM_CHANNEL_RATE
+        self.join_count = Config.ANTISPAM_JOIN_COUNT
+        self.join_window = Config.ANTISPAM_JOIN_WINDOW
+        self.max_users = Config.ANTISPAM_MAX_TRACKED_USERS
+        self.idle_ttl = Config.ANTISPAM_IDLE_TTL
+        
+        self.users = OrderedDict()   # (guild_id, user_id) -> UserState
+        self.channels = {}           # channel_id -> TokenBucket
+        self.joins = {}              # guild_id -> deque de horários de entrada
+    
+    def check_message(self, guild_id, channel_id, user_id, content, now=None):
+        """Retorna (motivo do usuário ou None, canal sobrecarregado?)"""
+        now = now or time.monotonic()
+        key = (guild_id, user_id)
+        
+        state = self.users.get(key)
+        if state is None:
+            state = self.users[key] = UserState(now)
+            self._evict(now)
+        else:
+            self.users.move_to_end(key)
+        
+        bucket = self.channels.get(channel_id)
+        if bucket is None:
+            bucket = self.channels[channel_id] = TokenBucket(self.channel_capacity, now)
+        channel_flood = not bucket.take(self.channel_capacity, self.channel_rate, now)
+        
+        state.last_seen = now
+        times = state.times
+        times.append(now)
+        if len(times) > self.flood_count:
+            del times[0]
+        # Mensagens sem texto (anexos, figurinhas) não contam como repetidas
+        hashes = state.hashes
+        text = content.strip().lower()
+        if text:
+            hashes.append((hash(text), now))
+            if len(hashes) > self.duplicate_count:
+                del hashes[0]
+        
+        if now < state.punished_until:
+            return None, channel_flood
+        
+        reason = None
+        if len(times) == self.flood_count and now - times[0] <= self.flood_window:
+            reason = "flood de mensagens"
+        elif len(hashes) == self.duplicate_count and now - hashes[0][1] <= self.duplicate_window \
+                and all(h == hashes[-1][0] for h, _ in hashes):
+            reason = "mensagens repetidas"
+        
+        if reason:
+            state.punished_until = now + self.flood_window
+            times.clear()
+            hashes.clear()
+        return reason, channel_flood
+    
+    def check_join(self, guild_id, now=None):
+        """Registra uma entrada no servidor; retorna se o ritmo caracteriza raid"""
+        now = now or time.monotonic()
+        joins = self.joins.get(guild_id)
+        if joins is None:
+            joins = self.joins[guild_id] = deque(maxlen=self.join_count)
+        joins.append(now)
+        
+        if len(joins) == self.join_count and now - joins[0] <= self.join_window:
+            joins.clear()
+            return True
+        return False
+    
+    def _evict(self, now):
+        users = self.users
+        while len(users) > self.max_users:
+            users.popitem(last=False)
+        
+        # As entradas mais antigas ficam no início; parar na primeira ativa
+        while users:
+            state = next(iter(users.values()))
+            if now - state.last_seen <= self.idle_ttl:
+                break
+            users.popitem(last=False)
+
+class AntiSpam(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.detector = SpamDetector()
+        self.slowmode_channels = set()
+    
+    async def cog_load(self):
+        await setup_settings(self.bot)
+        # Agendador compartilhado criado no setup_hook, iniciado após o registro dos handlers
+        self.bot.scheduler.register('slowmode_off', self.expire_slowmode)
+        self.bot.scheduler.register('lockdown_off', self.expire_lockdown)
+    
+    def cog_unload(self):
+        self.bot.scheduler.unregister('slowmode_off')
+        self.bot.scheduler.unregister('lockdown_off')
+    
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.author.bot or not message.guild:
+            return
+        
+        reason, channel_flood = self.detector.check_message(
+            message.guild.id, message.channel.id, message.author.id, message.content
+        )
+        
+        if channel_flood and message.channel.id not in self.slowmode_channels:
+            await self.apply_slowmode(message.channel)
+        
+        if reason and not message.channel.permissions_for(message.author).manage_messages:
+            await self.punish(message, reason)
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        if self.detector.check_join(member.guild.id):
+            await self.lockdown(member.guild)
+    
+    async def punish(self, message, reason):
+        guild = message.guild
+        member = message.author
+        action = Config.ANTISPAM_ACTION
+        moderation = self.bot.get_cog("Moderation")
+        
+        try:
+            await message.channel.purge(limit=50, check=lambda m: m.author.id == member.id)
+            if not moderation or action == 'delete':
+                return
+            
+            if action == 'warn':
+                await moderation.warn_member(guild, member, guild.me, f"Antispam: {reason}")
+            elif action == 'mute':
+                duration = Config.ANTISPAM_MUTE_DURATION
+                await moderation.mute_member(guild, member, guild.me, parse_duration(duration),
+                                             duration, f"Antispam: {reason}", message.channel)
+            elif action == 'kick':
+                await moderation.kick_member(guild, member, guild.me, f"Antispam: {reason}")
+        except discord.HTTPException as e:
+            logger.warning(f"Antispam: falha ao punir {member} ({member.id}) por {reason}: {e}")
+    
+    async def apply_slowmode(self, channel):
+        if not isinstance(channel, discord.TextChannel) or channel.slowmode_delay:
+            return
+        
+        self.slowmode_channels.add(channel.id)
+        try:
+            await channel.edit(slowmode_delay=Config.ANTISPAM_SLOWMODE_DELAY,
+                               reason="Antispam: canal sobrecarregado")
+            await self.bot.scheduler.schedule('slowmode_off', channel.guild.id, channel.id,
+                                              Config.ANTISPAM_SLOWMODE_SECONDS)
+            logger.info(f"Antispam: modo lento ativado em #{channel} ({channel.id})")
+        except discord.HTTPException as e:
+            self.slowmode_channels.discard(channel.id)
+            logger.warning(f"Antispam: falha ao ativar modo lento em #{channel}: {e}")
+    
+    async def expire_slowmode(self, guild_id, channel_id, _):
+        await self.bot.wait_until_ready()
+        self.slowmode_channels.discard(channel_id)
+        channel = self.bot.get_channel(channel_id)
+        if channel:
+            await channel.edit(slowmode_delay=0, reason="Antispam: fim do modo lento")
+    
+    async def lockdown(self, guild):
+        """Eleva o nível de verificação do servidor durante um raid"""
+        previous = guild.verification_level
+        if previous == discord.VerificationLevel.highest:
+            return
+        
+        try:
+            await guild.edit(verification_level=discord.VerificationLevel.highest,
+                             reason="Antispam: raid detectado")
+        except discord.HTTPException as e:
+            logger.warning(f"Antispam: falha ao bloquear {guild.name} ({guild.id}): {e}")
+            return
+        
+        # O nível anterior é guardado como alvo da tarefa agendada
+        await self.bot.scheduler.schedule('lockdown_off', guild.id, previous.value,
+                                          Config.ANTISPAM_LOCKDOWN_SECONDS)
+        logger.warning(f"Antispam: raid detectado em {guild.name} ({guild.id}), servidor bloqueado")
+        
+        embed = discord.Embed(
+            title="🚨 Raid detectado",
+            description=f"Nível de verificação elevado por "
+                        f"{Config.ANTISPAM_LOCKDOWN_SECONDS // 60} minutos.",
+            color=Config.COLORS['error']
+        )
+        self.bot.log_dispatcher.send(self.bot.settings.get(guild.id, 'mod_log_channel'), embed)
+    
+    async def expire_lockdown(self, guild_id, previous_level, _):
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(guild_id)
+        if guild:
+            await guild.edit(verification_level=discord.VerificationLevel(previous_level),
+                             reason="Antispam: fim do bloqueio")
+
+async def setup(bot):
+    await bot.add_cog(AntiSpam(bot))
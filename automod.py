@@ -0,0 +1,321 @@
+import discord
+from discord.ext import commands
+from collections import deque
+import re
+import logging
+from config import Config
+from moderation import parse_duration
+
+logger = logging.getLogger(__name__)
+
+# Ações possíveis, da mais branda para a mais severa
+ACTIONS = ['delete', 'warn', 'mute', 'kick']
+
+class AhoCorasick:
+    """Autômato de múltiplos padrões: o custo da busca depende só do texto
+    
+    Os padrões são comparados em minúsculas e apenas como palavras inteiras
+    (o caractere antes e depois do trecho não pode ser alfanumérico).
+    """
+    
+    def __init__(self, patterns):
+        # patterns: iterável de (texto, payload)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        
+        for text, payload in patterns:
+            text = text.lower()
+            if not text:
+                continue
+            node = 0
+            for char in text:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            self._output[node].append((len(text), payload))
+        
+        # Links de falha em largura
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+    
+    def __bool__(self):
+        return len(self._goto) > 1
+    
+    def search(self, text):
+        """Retorna os payloads de todos os padrões encontrados como palavra inteira"""
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                after = text[index + 1:index + 2]
+                if after.isalnum():
+                    continue
+                for length, payload in output[node]:
+                    start = index - length + 1
+                    if start == 0 or not text[start - 1].isalnum():
+                        found.add(payload)
+        return found
+
+GLOBAL_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+def prefilter_pattern(pattern):
+    """Reescreve uma regex para entrar na alternação do pré-filtro
+    
+    Grupos de captura viram `(?:...)` e flags globais (`(?i)`) viram flags
+    locais, o que não muda o que a regex casa. Retorna None se não for
+    possível: referências a grupos (`\\1`, `(?P=nome)`, `(?(1)...)`) e modo
+    verbose, em que `#` e espaços mudam o sentido do texto.
+    """
+    out, flags = [], ''
+    i, class_start = 0, None  # posição do `[` da classe de caracteres aberta
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if class_start is None and pattern[i + 1:i + 2] in tuple('123456789'):
+                return None
+            out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if class_start is not None:
+            # `]` logo após `[` ou `[^` é literal
+            if char == ']' and i != class_start + 1 and pattern[class_start + 1:i] != '^':
+                class_start = None
+        elif char == '[':
+            class_start = i
+        elif char == '(':
+            rest = pattern[i + 1:]
+            if rest.startswith(('?P=', '?(')):
+                return None
+            if rest.startswith('?P<'):
+                end = pattern.find('>', i)
+                if end < 0:
+                    return None
+                out.append('(?:')
+                i = end + 1
+                continue
+            match = GLOBAL_FLAGS.match(pattern, i)
+            if match:
+                flags += match.group(1)
+                i = match.end()
+                continue
+            if not rest.startswith('?'):
+                out.append('(?:')
+                i += 1
+                continue
+        out.append(char)
+        i += 1
+    
+    if 'x' in flags:
+        return None
+    body = ''.join(out)
+    rewritten = f'(?{flags}:{body})' if flags else f'(?:{body})'
+    try:
+        if re.compile(rewritten, re.IGNORECASE).groups:
+            return None
+    except re.error:
+        return None
+    return rewritten
+
+class RuleSet:
+    """Regras compiladas de um servidor: palavras no autômato, regex pré-filtradas numa única expressão
+    
+    Cada regex é compilada isoladamente, e é ela que decide se a regra foi
+    violada, então todas as regras que casam são reportadas. Uma versão sem
+    grupos de captura de cada regex (`prefilter_pattern`) entra numa
+    alternação que serve de pré-filtro: se ela não casa, nenhuma delas casa.
+    Só as regex que não podem ser reescritas são testadas sempre.
+    """
+    
+    def __init__(self, rules):
+        self.rules = {rule['id']: rule for rule in rules}
+        self.words = AhoCorasick(
+            (rule['pattern'], rule['id']) for rule in rules if rule['kind'] == 'word'
+        )
+        
+        self.simple = []    # (rule_id, regex) cobertas pelo pré-filtro
+        self.complex = []   # (rule_id, regex) testadas sempre
+        alternatives = []
+        for rule in rules:
+            if rule['kind'] != 'regex':
+                continue
+            try:
+                regex = re.compile(rule['pattern'], re.IGNORECASE)
+            except re.error as e:
+                logger.warning(f"Automod: regra #{rule['id']} ignorada, regex inválida: {e}")
+                self.rules.pop(rule['id'])
+                continue
+            alternative = prefilter_pattern(rule['pattern'])
+            if alternative:
+                self.simple.append((rule['id'], regex))
+                alternatives.append(alternative)
+            else:
+                self.complex.append((rule['id'], regex))
+        
+        self.prefilter = None
+        if self.simple:
+            try:
+                self.prefilter = re.compile('|'.join(alternatives), re.IGNORECASE)
+            except re.error:
+                self.complex += self.simple
+                self.simple = []
+    
+    def __bool__(self):
+        return bool(self.rules)
+    
+    def match(self, content):
+        """Retorna todas as regras violadas pelo conteúdo"""
+        matched = self.words.search(content) if self.words else set()
+        if self.prefilter and self.prefilter.search(content):
+            matched.update(rule_id for rule_id, regex in self.simple if regex.search(content))
+        matched.update(rule_id for rule_id, regex in self.complex if regex.search(content))
+        return [self.rules[rule_id] for rule_id in matched]
+
+class AutoMod(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.rulesets = {}  # guild_id -> RuleSet
+    
+    async def cog_load(self):
+        rules = {}
+        for rule in await self.bot.db.get_automod_rules():
+            rules.setdefault(rule['guild_id'], []).append(rule)
+        
+        # Uma regra ruim no banco não pode impedir o bot de iniciar
+        for guild_id, guild_rules in rules.items():
+            try:
+                self.rulesets[guild_id] = RuleSet(guild_rules)
+            except Exception as e:
+                logger.error(f"Automod: regras do servidor {guild_id} não carregadas: {e}")
+    
+    async def reload_guild(self, guild_id):
+        rules = await self.bot.db.get_automod_rules(guild_id)
+        self.rulesets[guild_id] = RuleSet(rules)
+    
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.author.bot or not message.guild or not message.content:
+            return
+        
+        ruleset = self.rulesets.get(message.guild.id)
+        if not ruleset:
+            return
+        
+        # Moderadores não são filtrados
+        if message.channel.permissions_for(message.author).manage_messages:
+            return
+        
+        violations = ruleset.match(message.content)
+        if not violations:
+            return
+        
+        rule = max(violations, key=lambda r: ACTIONS.index(r['action']))
+        await self.enforce(message, rule)
+    
+    async def enforce(self, message, rule):
+        guild = message.guild
+        member = message.author
+        reason = f"Automod: regra #{rule['id']}"
+        
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            pass
+        
+        moderation = self.bot.get_cog("Moderation")
+        if rule['action'] == 'delete' or not moderation:
+            return
+        
+        try:
+            if rule['action'] == 'warn':
+                await moderation.warn_member(guild, member, guild.me, reason)
+            elif rule['action'] == 'mute':
+                duration = Config.AUTOMOD_MUTE_DURATION
+                await moderation.mute_member(guild, member, guild.me, parse_duration(duration),
+                                             duration, reason, message.channel)
+            elif rule['action'] == 'kick':
+                await moderation.kick_member(guild, member, guild.me, reason)
+        except discord.HTTPException as e:
+            logger.warning(f"Automod: falha ao aplicar '{rule['action']}' em {member} ({member.id}): {e}")
+    
+    @commands.command(name="automod-add")
+    @commands.has_permissions(administrator=True)
+    async def automod_add(self, ctx, kind: str, action: str, *, pattern: str):
+        """Adiciona uma regra (tipo: word/regex, ação: delete/warn/mute/kick)"""
+        kind, action = kind.lower(), action.lower()
+        if kind not in ('word', 'regex') or action not in ACTIONS:
+            await ctx.send(f"❌ Use `automod-add <word|regex> <{'|'.join(ACTIONS)}> <padrão>`.")
+            return
+        
+        if kind == 'regex':
+            # Validar do mesmo jeito que a regra será compilada no RuleSet
+            try:
+                re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                await ctx.send(f"❌ Regex inválida: {e}")
+                return
+        
+        rule_id = await self.bot.db.add_automod_rule(ctx.guild.id, kind, pattern, action, ctx.author.id)
+        await self.reload_guild(ctx.guild.id)
+        
+        embed = discord.Embed(
+            description=f"✅ Regra #{rule_id} adicionada ({kind}, {action}).",
+            color=Config.COLORS['success']
+        )
+        await ctx.send(embed=embed)
+    
+    @commands.command(name="automod-remove")
+    @commands.has_permissions(administrator=True)
+    async def automod_remove(self, ctx, rule_id: int):
+        """Remove uma regra da automoderação"""
+        if not await self.bot.db.delete_automod_rule(ctx.guild.id, rule_id):
+            await ctx.send("❌ Regra não encontrada.")
+            return
+        
+        await self.reload_guild(ctx.guild.id)
+        embed = discord.Embed(
+            description=f"🗑️ Regra #{rule_id} removida.",
+            color=Config.COLORS['success']
+        )
+        await ctx.send(embed=embed)
+    
+    @commands.command(name="automod-list")
+    @commands.has_permissions(administrator=True)
+    async def automod_list(self, ctx):
+        """Lista as regras da automoderação deste servidor"""
+        ruleset = self.rulesets.get(ctx.guild.id)
+        if not ruleset:
+            await ctx.send("📋 Nenhuma regra configurada.")
+            return
+        
+        lines = [
+            f"`#{rule['id']}` {rule['kind']} → **{rule['action']}**: `{rule['pattern'][:50]}`"
+            for rule in list(ruleset.rules.values())[:25]
+        ]
+        embed = discord.Embed(
+            title=f"🤖 Automoderação ({len(ruleset.rules)} regras)",
+            description="\n".join(lines),
+            color=Config.COLORS['info']
+        )
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(AutoMod(bot))
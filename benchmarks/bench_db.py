@@ -0,0 +1,100 @@
+"""Benchmarks do banco citados nos commits de desempenho
+
+Uso: python benchmarks/bench_db.py <modo> [opções]. Cada modo cria um
+banco temporário, então pode ser rodado em qualquer máquina; os números
+variam com o disco, compare apenas as linhas de uma mesma execução.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database import Database, connect
+
+TEMP_DIR = None  # diretório temporário da execução, removido no fim
+
+def temp_db():
+    return os.path.join(tempfile.mkdtemp(dir=TEMP_DIR), 'bench.db')
+
+async def seed_cases(db, rows, users=1000, guild_id=1):
+    batch = 10000
+    for start in range(0, rows, batch):
+        await db.add_mod_actions([
+            (f'C{i}', i % users, 1, 'warn', 'benchmark', None, guild_id)
+            for i in range(start, min(start + batch, rows))
+        ])
+
+async def bench_reads(args):
+    """Leituras concorrentes: conexão por chamada x pool (user-002)"""
+    path = temp_db()
+    for pooled in (False, True):
+        db = await asyncio.to_thread(Database, path, pooled)
+        if not pooled:
+            await seed_cases(db, args.rows)
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(db.get_user_warnings(1, i % 1000) for i in range(args.calls)))
+        elapsed = time.perf_counter() - start
+        print(f"{'pool' if pooled else 'conexão por chamada':>20}: {args.calls / elapsed:8.0f} leituras/s")
+        await asyncio.to_thread(db.close)
+
+async def bench_index(args):
+    """Busca de advertências com e sem o índice da migração 1 (user-003)"""
+    path = temp_db()
+    users = max(args.rows // 10, 1)  # ~10 casos por usuário
+    db = await asyncio.to_thread(Database, path)
+    await seed_cases(db, args.rows, users)
+    await asyncio.to_thread(db.close)
+    
+    conn = connect(path)
+    lookups = min(args.calls, 200)
+    for label in ('com índice', 'sem índice'):
+        if label == 'sem índice':
+            conn.execute('DROP INDEX idx_moderation_user_action')
+        start = time.perf_counter()
+        for i in range(lookups):
+            Database._get_user_warnings(conn, 1, i * 7919 % users)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>20}: {elapsed / lookups * 1000:8.3f} ms por busca ({args.rows} casos)")
+    conn.close()
+
+async def bench_writes(args):
+    """Escritas concorrentes com diferentes tamanhos de lote do group commit (user-004)"""
+    for batch in (1, 10, 100):
+        Config.DB_BATCH_MAX_SIZE = batch
+        db = await asyncio.to_thread(Database, temp_db())
+        
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            db.add_mod_action(f'C{i}', i % 1000, 1, 'warn', 'benchmark', guild_id=1) for i in range(args.calls)
+        ))
+        elapsed = time.perf_counter() - start
+        print(f"{f'lote de {batch}':>20}: {args.calls / elapsed:8.0f} inserções/s")
+        await asyncio.to_thread(db.close)
+
+MODES = {
+    'reads': bench_reads,
+    'index': bench_index,
+    'writes': bench_writes,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('mode', choices=MODES)
+    parser.add_argument('--rows', type=int, default=10000, help='linhas de moderação pré-carregadas')
+    parser.add_argument('--calls', type=int, default=3000, help='chamadas concorrentes')
+    parser.add_argument('--dir', help='diretório dos bancos temporários (padrão: o do sistema)')
+    args = parser.parse_args()
+    
+    # --dir escolhe o disco: nas escritas o fsync domina o resultado
+    global TEMP_DIR
+    with tempfile.TemporaryDirectory(prefix='bench_db_', dir=args.dir) as TEMP_DIR:
+        asyncio.run(MODES[args.mode](args))
+
+if __name__ == '__main__':
+    main()
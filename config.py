@@ -32,6 +32,87 @@ class Config:
     TICKET_CATEGORY = int(os.getenv('TICKET_CATEGORY', 0))
     CLOSED_CATEGORY = int(os.getenv('CLOSED_CATEGORY', 0))
     
+    # Banco de dados
+    DB_NAME = os.getenv('DB_NAME', 'tickets.db')
+    DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'true').lower() == 'true'
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 4))
+    DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', 16384))
+    DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 64 * 1024 * 1024))
+    DB_BATCH_MAX_SIZE = int(os.getenv('DB_BATCH_MAX_SIZE', 100))
+    DB_BATCH_INTERVAL_MS = float(os.getenv('DB_BATCH_INTERVAL_MS', 2))
+    DB_DURABLE_COMMITS = os.getenv('DB_DURABLE_COMMITS', 'true').lower() == 'true'
+    
+    # Sharding: SHARDING=true usa AutoShardedBot; SHARD_COUNT=0 usa a contagem recomendada.
+    # O launcher.py define SHARD_IDS (ex.: '0-3' ou '0,2') para cada processo.
+    SHARDING = os.getenv('SHARDING', 'false').lower() == 'true'
+    SHARD_COUNT = int(os.getenv('SHARD_COUNT', 0))
+    SHARD_IDS = os.getenv('SHARD_IDS', '')
+    SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', 1))
+    SHARD_STATS_INTERVAL = int(os.getenv('SHARD_STATS_INTERVAL', 300))
+    
+    # IDs de casos e tickets (cada processo do bot precisa de um worker distinto, 0-1023)
+    ID_WORKER_ID = int(os.getenv('ID_WORKER_ID', 0))
+    
+    # Moderação
+    MUTE_PROVISION_CONCURRENCY = int(os.getenv('MUTE_PROVISION_CONCURRENCY', 5))
+    MASS_ACTION_CONCURRENCY = int(os.getenv('MASS_ACTION_CONCURRENCY', 5))
+    MASS_ACTION_MAX_TARGETS = int(os.getenv('MASS_ACTION_MAX_TARGETS', 1000))
+    MASS_ACTION_PROGRESS_INTERVAL = float(os.getenv('MASS_ACTION_PROGRESS_INTERVAL', 2))
+    
+    # Envio de logs em lote
+    LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', 1))
+    LOG_MAX_QUEUE = int(os.getenv('LOG_MAX_QUEUE', 5000))
+    LOG_MAX_RETRIES = int(os.getenv('LOG_MAX_RETRIES', 5))
+    
+    # Métricas no formato do Prometheus em http://METRICS_HOST:METRICS_PORT/metrics (porta 0 desativa)
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
+    METRICS_LAG_INTERVAL = float(os.getenv('METRICS_LAG_INTERVAL', 0.5))
+    
+    # Cache de usuários (fetch_user)
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 5000))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 3600))
+    
+    # Transcrições de tickets ('txt' ou 'html')
+    TRANSCRIPT_FORMAT = os.getenv('TRANSCRIPT_FORMAT', 'txt')
+    TRANSCRIPT_GZIP = os.getenv('TRANSCRIPT_GZIP', 'false').lower() == 'true'
+    
+    # Pool de canais de ticket pré-criados (0 desativa; cada canal ocupa uma das 50 vagas da categoria)
+    TICKET_POOL_SIZE = int(os.getenv('TICKET_POOL_SIZE', 2))
+    TICKET_POOL_REFILL_DELAY = float(os.getenv('TICKET_POOL_REFILL_DELAY', 2))
+    
+    # Captura de mensagens de tickets
+    MESSAGE_CAPTURE_INTERVAL = float(os.getenv('MESSAGE_CAPTURE_INTERVAL', 1))
+    MESSAGE_CAPTURE_MAX_BUFFER = int(os.getenv('MESSAGE_CAPTURE_MAX_BUFFER', 500))
+    # Teto do buffer enquanto o banco falha (inserções descartadas são recuperadas do histórico)
+    MESSAGE_CAPTURE_MAX_PENDING = int(os.getenv('MESSAGE_CAPTURE_MAX_PENDING', 20000))
+    
+    # Limpeza de tickets fechados (prazo padrão: AUTO_CLOSE_DAYS)
+    CLEANUP_INTERVAL_MINUTES = float(os.getenv('CLEANUP_INTERVAL_MINUTES', 60))
+    CLEANUP_CONCURRENCY = int(os.getenv('CLEANUP_CONCURRENCY', 3))
+    CLEANUP_BATCH_SIZE = int(os.getenv('CLEANUP_BATCH_SIZE', 200))
+    
+    # Automoderação
+    AUTOMOD_MUTE_DURATION = os.getenv('AUTOMOD_MUTE_DURATION', '10m')
+    
+    # Antispam
+    ANTISPAM_ACTION = os.getenv('ANTISPAM_ACTION', 'mute')  # delete, warn, mute ou kick
+    ANTISPAM_MUTE_DURATION = os.getenv('ANTISPAM_MUTE_DURATION', '10m')
+    ANTISPAM_FLOOD_COUNT = int(os.getenv('ANTISPAM_FLOOD_COUNT', 6))
+    ANTISPAM_FLOOD_WINDOW = float(os.getenv('ANTISPAM_FLOOD_WINDOW', 5))
+    ANTISPAM_DUPLICATE_COUNT = int(os.getenv('ANTISPAM_DUPLICATE_COUNT', 4))
+    ANTISPAM_DUPLICATE_WINDOW = float(os.getenv('ANTISPAM_DUPLICATE_WINDOW', 30))
+    ANTISPAM_CHANNEL_BURST = int(os.getenv('ANTISPAM_CHANNEL_BURST', 30))
+    ANTISPAM_CHANNEL_RATE = float(os.getenv('ANTISPAM_CHANNEL_RATE', 2))
+    ANTISPAM_SLOWMODE_DELAY = int(os.getenv('ANTISPAM_SLOWMODE_DELAY', 5))
+    ANTISPAM_SLOWMODE_SECONDS = int(os.getenv('ANTISPAM_SLOWMODE_SECONDS', 300))
+    ANTISPAM_JOIN_COUNT = int(os.getenv('ANTISPAM_JOIN_COUNT', 10))
+    ANTISPAM_JOIN_WINDOW = float(os.getenv('ANTISPAM_JOIN_WINDOW', 10))
+    ANTISPAM_LOCKDOWN_SECONDS = int(os.getenv('ANTISPAM_LOCKDOWN_SECONDS', 900))
+    ANTISPAM_MAX_TRACKED_USERS = int(os.getenv('ANTISPAM_MAX_TRACKED_USERS', 100000))
+    ANTISPAM_IDLE_TTL = float(os.getenv('ANTISPAM_IDLE_TTL', 600))
+    
     # Limites
     MAX_TICKETS_PER_USER = 3
     AUTO_CLOSE_DAYS = 7
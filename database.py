@@ -1,18 +1,406 @@
 import sqlite3
 import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 import logging
+from config import Config
+from metrics import DB_QUERY_SECONDS, DB_ERRORS
 
 logger = logging.getLogger(__name__)
 
-class Database:
-    def __init__(self, db_name='tickets.db'):
+# Migrações versionadas do schema: (versão, descrição, comandos).
+# Novas migrações devem ser apenas acrescentadas ao final da lista.
+MIGRATIONS = [
+    (1, "índices de tickets, mensagens e moderação", [
+        'CREATE INDEX IF NOT EXISTS idx_tickets_user_status ON tickets (user_id, status)',
+        'CREATE INDEX IF NOT EXISTS idx_tickets_status_closed ON tickets (status, closed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_moderation_user_action ON moderation (user_id, action, active)',
+        'CREATE INDEX IF NOT EXISTS idx_ticket_messages_ticket ON ticket_messages (ticket_id, timestamp)',
+    ]),
+    (2, "tarefas agendadas (mutes temporários)", [
+        '''CREATE TABLE IF NOT EXISTS scheduled_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            guild_id INTEGER NOT NULL,
+            target_id INTEGER NOT NULL,
+            channel_id INTEGER,
+            run_at REAL NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_scheduled_tasks_target ON scheduled_tasks (kind, guild_id, target_id)',
+    ]),
+    (3, "captura de mensagens de tickets", [
+        'ALTER TABLE ticket_messages ADD COLUMN message_id INTEGER',
+        'ALTER TABLE ticket_messages ADD COLUMN author_name TEXT',
+        'ALTER TABLE ticket_messages ADD COLUMN edited_at TIMESTAMP',
+        'ALTER TABLE ticket_messages ADD COLUMN deleted_at TIMESTAMP',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_ticket_messages_message ON ticket_messages (message_id)',
+        # Tickets abertos antes da captura não têm o histórico completo no banco
+        'ALTER TABLE tickets ADD COLUMN messages_captured BOOLEAN DEFAULT false',
+        'CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets (channel_id)',
+    ]),
+    (4, "busca textual (FTS5) em casos e mensagens de tickets", [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS moderation_fts USING fts5(reason, content='moderation', content_rowid='id')",
+        '''CREATE TRIGGER IF NOT EXISTS moderation_fts_insert AFTER INSERT ON moderation BEGIN
+            INSERT INTO moderation_fts (rowid, reason) VALUES (new.id, new.reason);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS moderation_fts_delete AFTER DELETE ON moderation BEGIN
+            INSERT INTO moderation_fts (moderation_fts, rowid, reason) VALUES ('delete', old.id, old.reason);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS moderation_fts_update AFTER UPDATE OF reason ON moderation BEGIN
+            INSERT INTO moderation_fts (moderation_fts, rowid, reason) VALUES ('delete', old.id, old.reason);
+            INSERT INTO moderation_fts (rowid, reason) VALUES (new.id, new.reason);
+        END''',
+        "INSERT INTO moderation_fts (moderation_fts) VALUES ('rebuild')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS ticket_messages_fts USING fts5(message, content='ticket_messages', content_rowid='id')",
+        '''CREATE TRIGGER IF NOT EXISTS ticket_messages_fts_insert AFTER INSERT ON ticket_messages BEGIN
+            INSERT INTO ticket_messages_fts (rowid, message) VALUES (new.id, new.message);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS ticket_messages_fts_delete AFTER DELETE ON ticket_messages BEGIN
+            INSERT INTO ticket_messages_fts (ticket_messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS ticket_messages_fts_update AFTER UPDATE OF message ON ticket_messages BEGIN
+            INSERT INTO ticket_messages_fts (ticket_messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+            INSERT INTO ticket_messages_fts (rowid, message) VALUES (new.id, new.message);
+        END''',
+        "INSERT INTO ticket_messages_fts (ticket_messages_fts) VALUES ('rebuild')",
+        'CREATE INDEX IF NOT EXISTS idx_moderation_created ON moderation (created_at)',
+    ]),
+    (5, "servidor nos registros e contadores de estatísticas", [
+        'ALTER TABLE tickets ADD COLUMN guild_id INTEGER',
+        'ALTER TABLE moderation ADD COLUMN guild_id INTEGER',
+        # Registros antigos ficam sem servidor até adopt_legacy_rows (no início do bot)
+        '''CREATE TABLE IF NOT EXISTS stats_counters (
+            guild_id INTEGER NOT NULL,
+            metric TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, metric)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS stats_hourly (
+            guild_id INTEGER NOT NULL,
+            bucket TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, bucket, metric)
+        )''',
+        # Carga inicial a partir dos dados existentes
+        '''INSERT INTO stats_counters (guild_id, metric, value)
+            SELECT COALESCE(guild_id, 0), 'tickets.total', COUNT(*) FROM tickets GROUP BY 1''',
+        '''INSERT INTO stats_counters (guild_id, metric, value)
+            SELECT COALESCE(guild_id, 0), 'tickets.' || status, COUNT(*) FROM tickets GROUP BY 1, 2''',
+        '''INSERT INTO stats_counters (guild_id, metric, value)
+            SELECT COALESCE(guild_id, 0), 'cases.total', COUNT(*) FROM moderation GROUP BY 1''',
+        '''INSERT INTO stats_counters (guild_id, metric, value)
+            SELECT COALESCE(guild_id, 0), 'cases.' || action, COUNT(*) FROM moderation GROUP BY 1, 2''',
+        '''INSERT INTO stats_hourly (guild_id, bucket, metric, value)
+            SELECT COALESCE(guild_id, 0), strftime('%Y-%m-%d %H:00', created_at), 'tickets.opened', COUNT(*)
+            FROM tickets GROUP BY 1, 2''',
+        '''INSERT INTO stats_hourly (guild_id, bucket, metric, value)
+            SELECT COALESCE(guild_id, 0), strftime('%Y-%m-%d %H:00', closed_at), 'tickets.closed', COUNT(*)
+            FROM tickets WHERE closed_at IS NOT NULL GROUP BY 1, 2''',
+        '''INSERT INTO stats_hourly (guild_id, bucket, metric, value)
+            SELECT COALESCE(guild_id, 0), strftime('%Y-%m-%d %H:00', created_at), 'cases', COUNT(*)
+            FROM moderation GROUP BY 1, 2''',
+        # Triggers mantêm os contadores na mesma transação de cada escrita
+        '''CREATE TRIGGER IF NOT EXISTS stats_tickets_insert AFTER INSERT ON tickets BEGIN
+            INSERT INTO stats_counters (guild_id, metric, value) VALUES (COALESCE(new.guild_id, 0), 'tickets.total', 1)
+                ON CONFLICT (guild_id, metric) DO UPDATE SET value = value + 1;
+            INSERT INTO stats_counters (guild_id, metric, value) VALUES (COALESCE(new.guild_id, 0), 'tickets.' || new.status, 1)
+                ON CONFLICT (guild_id, metric) DO UPDATE SET value = value + 1;
+            INSERT INTO stats_hourly (guild_id, bucket, metric, value)
+                VALUES (COALESCE(new.guild_id, 0), strftime('%Y-%m-%d %H:00', 'now'), 'tickets.opened', 1)
+                ON CONFLICT (guild_id, bucket, metric) DO UPDATE SET value = value + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS stats_tickets_status AFTER UPDATE OF status ON tickets
+        WHEN old.status IS NOT new.status BEGIN
+            UPDATE stats_counters SET value = value - 1
+                WHERE guild_id = COALESCE(old.guild_id, 0) AND metric = 'tickets.' || old.status;
+            INSERT INTO stats_counters (guild_id, metric, value) VALUES (COALESCE(new.guild_id, 0), 'tickets.' || new.status, 1)
+                ON CONFLICT (guild_id, metric) DO UPDATE SET value = value + 1;
+            INSERT INTO stats_hourly (guild_id, bucket, metric, value)
+                VALUES (COALESCE(new.guild_id, 0), strftime('%Y-%m-%d %H:00', 'now'), 'tickets.' || new.status, 1)
+                ON CONFLICT (guild_id, bucket, metric) DO UPDATE SET value = value + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS stats_tickets_delete AFTER DELETE ON tickets BEGIN
+            UPDATE stats_counters SET value = value - 1
+                WHERE guild_id = COALESCE(old.guild_id, 0) AND metric IN ('tickets.total', 'tickets.' || old.status);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS stats_moderation_insert AFTER INSERT ON moderation BEGIN
+            INSERT INTO stats_counters (guild_id, metric, value) VALUES (COALESCE(new.guild_id, 0), 'cases.total', 1)
+                ON CONFLICT (guild_id, metric) DO UPDATE SET value = value + 1;
+            INSERT INTO stats_counters (guild_id, metric, value) VALUES (COALESCE(new.guild_id, 0), 'cases.' || new.action, 1)
+                ON CONFLICT (guild_id, metric) DO UPDATE SET value = value + 1;
+            INSERT INTO stats_hourly (guild_id, bucket, metric, value)
+                VALUES (COALESCE(new.guild_id, 0), strftime('%Y-%m-%d %H:00', 'now'), 'cases', 1)
+                ON CONFLICT (guild_id, bucket, metric) DO UPDATE SET value = value + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS stats_moderation_delete AFTER DELETE ON moderation BEGIN
+            UPDATE stats_counters SET value = value - 1
+                WHERE guild_id = COALESCE(old.guild_id, 0) AND metric IN ('cases.total', 'cases.' || old.action);
+        END''',
+    ]),
+    (6, "retenção de tickets fechados", [
+        'ALTER TABLE tickets ADD COLUMN purged_at TIMESTAMP',
+        'ALTER TABLE settings ADD COLUMN retention_days INTEGER',
+        '''CREATE INDEX IF NOT EXISTS idx_tickets_purge ON tickets (closed_at)
+            WHERE status = 'closed' AND purged_at IS NULL''',
+    ]),
+    (7, "regras de automoderação", [
+        '''CREATE TABLE IF NOT EXISTS automod_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            pattern TEXT NOT NULL,
+            action TEXT NOT NULL,
+            created_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_automod_rules_guild ON automod_rules (guild_id)',
+    ]),
+    (8, "configurações por servidor", [
+        'ALTER TABLE settings ADD COLUMN support_role INTEGER',
+        'ALTER TABLE settings ADD COLUMN ticket_log_channel INTEGER',
+        'ALTER TABLE settings ADD COLUMN ticket_category INTEGER',
+        'ALTER TABLE settings ADD COLUMN closed_category INTEGER',
+        'ALTER TABLE settings ADD COLUMN max_tickets INTEGER',
+    ]),
+    (9, "buscas restritas ao servidor", [
+        'CREATE INDEX IF NOT EXISTS idx_moderation_guild ON moderation (guild_id, id)',
+        'CREATE INDEX IF NOT EXISTS idx_tickets_guild ON tickets (guild_id)',
+    ]),
+    (10, "estado do provisionamento do cargo Muted", [
+        '''CREATE TABLE IF NOT EXISTS mute_provisioning (
+            guild_id INTEGER PRIMARY KEY,
+            role_id INTEGER NOT NULL,
+            cursor INTEGER NOT NULL DEFAULT 0,
+            done BOOLEAN NOT NULL DEFAULT false,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+    ]),
+    (11, "registros antigos atribuídos ao servidor 0 voltam a ficar sem servidor", [
+        # A migração 5 usava GUILD_ID, que costuma não estar definido (0 nunca é um ID válido)
+        'UPDATE tickets SET guild_id = NULL WHERE guild_id = 0',
+        'UPDATE moderation SET guild_id = NULL WHERE guild_id = 0',
+    ]),
+]
+
+# Escritas que alteram `stats_counters` (via triggers em tickets e moderation);
+# só elas invalidam o cache de contadores
+COUNTER_WRITES = {
+    '_create_ticket', '_close_ticket', '_reopen_ticket',
+    '_add_mod_action', '_add_mod_actions', '_adopt_legacy_rows',
+}
+
+# Colunas de `settings` que podem ser alteradas por set_guild_setting
+SETTINGS_COLUMNS = {
+    'admin_role', 'mod_role', 'support_role', 'log_channel', 'ticket_log_channel',
+    'ticket_category', 'closed_category', 'max_tickets', 'retention_days',
+}
+
+def shard_filter(scope, column='guild_id'):
+    """Condição SQL que restringe `column` aos servidores dos shards deste processo
+    
+    `scope` é (shard_count, shard_ids) ou None (processo atende todos os
+    servidores). Usa a mesma fórmula do Discord: (guild_id >> 22) % shard_count.
+    """
+    if not scope:
+        return '', ()
+    shard_count, shard_ids = scope
+    placeholders = ', '.join('?' * len(shard_ids))
+    return f' AND (({column} >> 22) % ?) IN ({placeholders})', (shard_count, *shard_ids)
+
+def connect(db_name, tuned=True):
+    """Abre uma conexão, aplicando os PRAGMAs de desempenho quando `tuned`"""
+    conn = sqlite3.connect(db_name, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    if tuned:
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA cache_size = -{int(Config.DB_CACHE_SIZE_KB)}')
+        conn.execute(f'PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}')
+        conn.execute(f'PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE)}')
+    return conn
+
+class ConnectionPool:
+    """Pool limitado de conexões persistentes, criadas sob demanda"""
+    
+    def __init__(self, db_name, size):
         self.db_name = db_name
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return connect(self.db_name)
+        
+        # Pool cheio: aguardar uma conexão ser devolvida
+        return self._idle.get()
+    
+    def release(self, conn):
+        self._idle.put(conn)
+    
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class WriteBatcher:
+    """Thread escritora única que agrupa as escritas em transações (group commit)
+    
+    Cada escrita roda dentro de um SAVEPOINT próprio, então a falha de uma
+    não desfaz as demais do mesmo lote. O future de cada chamada só é
+    resolvido depois do COMMIT do lote.
+    """
+    
+    def __init__(self, db_name, tuned=True, max_batch=None, interval_ms=None):
+        self.db_name = db_name
+        self.tuned = tuned
+        self.max_batch = max_batch or Config.DB_BATCH_MAX_SIZE
+        self.interval = (Config.DB_BATCH_INTERVAL_MS if interval_ms is None else interval_ms) / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name="database-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, func, args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((func, args, loop, future))
+        return future
+    
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+    
+    def _worker(self):
+        conn = connect(self.db_name, tuned=self.tuned)
+        conn.isolation_level = None  # transações controladas manualmente
+        if Config.DB_DURABLE_COMMITS:
+            conn.execute('PRAGMA synchronous = FULL')
+        
+        running = True
+        while running:
+            job = self._queue.get()
+            if job is None:
+                break
+            
+            batch = [job]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if job is None:
+                    running = False
+                    break
+                batch.append(job)
+            
+            self._flush(conn, batch)
+        
+        conn.close()
+    
+    def _flush(self, conn, batch):
+        results = []
+        try:
+            conn.execute('BEGIN')
+            for func, args, _, _ in batch:
+                conn.execute('SAVEPOINT write')
+                try:
+                    results.append((True, func(conn, *args)))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write')
+                    logger.error(f"Database error: {e}")
+                    results.append((False, e))
+                conn.execute('RELEASE write')
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            logger.error(f"Database error: falha no commit do lote ({len(batch)} escritas): {e}")
+            results = [(False, e)] * len(batch)
+        
+        for (_, _, loop, future), (ok, value) in zip(batch, results):
+            try:
+                loop.call_soon_threadsafe(self._resolve, future, ok, value)
+            except RuntimeError:
+                pass  # event loop já encerrado
+    
+    @staticmethod
+    def _resolve(future, ok, value):
+        if future.cancelled():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+class Database:
+    def __init__(self, db_name=None, pooled=None, pool_size=None):
+        self.db_name = db_name or Config.DB_NAME
+        self.pooled = Config.DB_POOL_ENABLED if pooled is None else pooled
+        pool_size = pool_size or Config.DB_POOL_SIZE
         self.init_db()
+        
+        # Escritas passam pela thread escritora (group commit); leituras usam
+        # o pool. Em modo WAL os leitores nunca bloqueiam o escritor.
+        self._writer = WriteBatcher(self.db_name, tuned=self.pooled)
+        self._readers = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="database-reader")
+        self._pool = ConnectionPool(self.db_name, pool_size) if self.pooled else None
+        
+        # Cache em memória dos contadores de estatísticas
+        self._counters = None
+        self._counters_dirty = True
+    
+    def _call_reader(self, func, *args):
+        with self.get_connection() as conn:
+            return func(conn, *args)
+    
+    async def _run(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return await self._writer.submit(func, args)
+        except Exception:
+            DB_ERRORS.inc(func.__name__, 'write')
+            raise
+        finally:
+            if func.__name__ in COUNTER_WRITES:
+                self._counters_dirty = True
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, func.__name__, 'write')
+    
+    async def _read(self, func, *args):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._readers, self._call_reader, func, *args)
+        except Exception:
+            DB_ERRORS.inc(func.__name__, 'read')
+            raise
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, func.__name__, 'read')
+    
+    def close(self):
+        """Aguarda as escritas pendentes e fecha as conexões do banco"""
+        self._writer.close()
+        self._readers.shutdown(wait=True)
+        if self._pool:
+            self._pool.close()
     
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_name)
+        pool = getattr(self, '_pool', None)
+        conn = pool.acquire() if pool else sqlite3.connect(self.db_name)
         conn.row_factory = sqlite3.Row
         try:
             yield conn
@@ -22,10 +410,17 @@ class Database:
             logger.error(f"Database error: {e}")
             raise
         finally:
-            conn.close()
+            if pool:
+                pool.release(conn)
+            else:
+                conn.close()
     
     def init_db(self):
         with self.get_connection() as conn:
+            if self.pooled:
+                # journal_mode é persistente no arquivo; basta configurar uma vez
+                conn.execute('PRAGMA journal_mode = WAL')
+            
             # Tabela de tickets
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS tickets (
@@ -79,46 +474,538 @@ class Database:
                     log_channel INTEGER
                 )
             ''')
+            
+            self.migrate(conn)
+    
+    def migrate(self, conn):
+        """Aplica as migrações pendentes, cada uma em sua própria transação"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        
+        current = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            
+            try:
+                # IMMEDIATE pega o lock de escrita antes de reler a versão: com vários
+                # processos (launcher) no mesmo arquivo, só um aplica cada migração
+                conn.execute('BEGIN IMMEDIATE')
+                current = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+                if version <= current:
+                    conn.rollback()
+                    continue
+                
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                             (version, description))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                logger.error(f"Falha ao aplicar a migração {version} ({description})")
+                raise
+            
+            logger.info(f"Migração {version} aplicada: {description}")
     
     # Métodos para tickets
-    async def create_ticket(self, ticket_id, user_id, channel_id, category):
-        with self.get_connection() as conn:
-            conn.execute('''
-                INSERT INTO tickets (ticket_id, user_id, channel_id, category)
-                VALUES (?, ?, ?, ?)
-            ''', (ticket_id, user_id, channel_id, category))
+    async def create_ticket(self, ticket_id, user_id, channel_id, category, guild_id=None):
+        await self._run(self._create_ticket, ticket_id, user_id, channel_id, category, guild_id)
     
     async def close_ticket(self, ticket_id, closed_by, reason=None):
-        with self.get_connection() as conn:
-            conn.execute('''
-                UPDATE tickets 
-                SET status = 'closed', closed_at = CURRENT_TIMESTAMP, 
-                    closed_by = ?, reason = ?
-                WHERE ticket_id = ?
-            ''', (closed_by, reason, ticket_id))
+        await self._run(self._close_ticket, ticket_id, closed_by, reason)
+    
+    async def reopen_ticket(self, ticket_id):
+        await self._run(self._reopen_ticket, ticket_id)
     
     async def get_ticket(self, ticket_id):
-        with self.get_connection() as conn:
-            cursor = conn.execute('SELECT * FROM tickets WHERE ticket_id = ?', (ticket_id,))
-            return cursor.fetchone()
+        return await self._read(self._get_ticket, ticket_id)
     
-    async def get_user_tickets(self, user_id):
-        with self.get_connection() as conn:
-            cursor = conn.execute('SELECT * FROM tickets WHERE user_id = ?', (user_id,))
-            return cursor.fetchall()
+    async def get_open_tickets(self, scope=None):
+        return await self._read(self._get_open_tickets, scope)
+    
+    async def get_purgeable_tickets(self, default_days, limit=200, scope=None):
+        return await self._read(self._get_purgeable_tickets, default_days, limit, scope)
+    
+    async def mark_tickets_purged(self, ticket_ids):
+        await self._run(self._mark_tickets_purged, ticket_ids)
+    
+    async def get_channel_ticket_id(self, channel_id):
+        return await self._read(self._get_channel_ticket_id, channel_id)
+    
+    async def get_ticket_channel_ids(self, channel_ids):
+        return await self._read(self._get_ticket_channel_ids, channel_ids)
+    
+    # Métodos para mensagens de tickets
+    async def save_ticket_messages(self, inserts, edits, deletes):
+        await self._run(self._save_ticket_messages, inserts, edits, deletes)
+    
+    async def get_ticket_messages(self, ticket_id, after_id=0, limit=1000):
+        return await self._read(self._get_ticket_messages, ticket_id, after_id, limit)
+    
+    async def get_ticket_message_stats(self, ticket_id):
+        return await self._read(self._get_ticket_message_stats, ticket_id)
+    
+    async def get_last_ticket_message_id(self, ticket_id):
+        return await self._read(self._get_last_ticket_message_id, ticket_id)
+    
+    async def get_captured_open_tickets(self, scope=None):
+        """Tickets abertos com captura, com o canal e a última mensagem gravada"""
+        return await self._read(self._get_captured_open_tickets, scope)
     
     # Métodos para moderação
-    async def add_mod_action(self, case_id, user_id, moderator_id, action, reason, duration=None):
-        with self.get_connection() as conn:
-            conn.execute('''
-                INSERT INTO moderation (case_id, user_id, moderator_id, action, reason, duration)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (case_id, user_id, moderator_id, action, reason, duration))
+    async def add_mod_action(self, case_id, user_id, moderator_id, action, reason, duration=None, guild_id=None):
+        await self._run(self._add_mod_action, case_id, user_id, moderator_id, action, reason, duration, guild_id)
     
-    async def get_user_warnings(self, user_id):
-        with self.get_connection() as conn:
-            cursor = conn.execute('''
-                SELECT * FROM moderation 
-                WHERE user_id = ? AND action = 'warn' AND active = true
-            ''', (user_id,))
-            return cursor.fetchall()
+    async def add_mod_actions(self, cases):
+        """Registra vários casos numa única transação
+        
+        `cases` é uma lista de tuplas (case_id, user_id, moderator_id, action,
+        reason, duration, guild_id).
+        """
+        if cases:
+            await self._run(self._add_mod_actions, cases)
+    
+    async def get_case(self, guild_id, case_id):
+        return await self._read(self._get_case, guild_id, case_id)
+    
+    async def get_user_warnings(self, guild_id, user_id):
+        return await self._read(self._get_user_warnings, guild_id, user_id)
+    
+    # Configurações por servidor
+    async def get_guild_settings(self, guild_id=None):
+        return await self._read(self._get_guild_settings, guild_id)
+    
+    async def set_guild_setting(self, guild_id, column, value):
+        if column not in SETTINGS_COLUMNS:
+            raise ValueError(f"Configuração desconhecida: {column}")
+        await self._run(self._set_guild_setting, guild_id, column, value)
+    
+    # Automoderação
+    async def add_automod_rule(self, guild_id, kind, pattern, action, created_by):
+        return await self._run(self._add_automod_rule, guild_id, kind, pattern, action, created_by)
+    
+    async def delete_automod_rule(self, guild_id, rule_id):
+        return await self._run(self._delete_automod_rule, guild_id, rule_id)
+    
+    async def get_automod_rules(self, guild_id=None):
+        return await self._read(self._get_automod_rules, guild_id)
+    
+    # Provisionamento do cargo Muted
+    async def save_mute_provisioning(self, guild_id, role_id, cursor, done=False):
+        await self._run(self._save_mute_provisioning, guild_id, role_id, cursor, done)
+    
+    async def get_pending_mute_provisioning(self, scope=None):
+        return await self._read(self._get_pending_mute_provisioning, scope)
+    
+    # Busca textual
+    async def search_cases(self, guild_id, text=None, user_id=None, moderator_id=None, action=None,
+                           since=None, until=None, limit=10, offset=0):
+        return await self._read(self._search_cases, guild_id, text, user_id, moderator_id, action,
+                                since, until, limit, offset)
+    
+    async def search_ticket_messages(self, guild_id, text=None, user_id=None, since=None, until=None,
+                                     limit=10, offset=0):
+        return await self._read(self._search_ticket_messages, guild_id, text, user_id, since, until,
+                                limit, offset)
+    
+    # Métodos para tarefas agendadas
+    async def add_scheduled_task(self, kind, guild_id, target_id, channel_id, run_at):
+        return await self._run(self._add_scheduled_task, kind, guild_id, target_id, channel_id, run_at)
+    
+    async def delete_scheduled_task(self, task_id):
+        await self._run(self._delete_scheduled_task, task_id)
+    
+    async def get_scheduled_tasks(self, scope=None):
+        return await self._read(self._get_scheduled_tasks, scope)
+    
+    # Estatísticas
+    async def get_counters(self, guild_id):
+        """Contadores do servidor, servidos da memória (recarregados após escritas)"""
+        if self._counters is None or self._counters_dirty:
+            self._counters_dirty = False
+            counters = {}
+            for row in await self._read(self._get_counters):
+                counters.setdefault(row['guild_id'], {})[row['metric']] = row['value']
+            self._counters = counters
+        return self._counters.get(guild_id, {})
+    
+    async def get_hourly_stats(self, guild_id, hours=24):
+        return await self._read(self._get_hourly_stats, guild_id, hours)
+    
+    async def get_user_stats(self, guild_id, user_id):
+        return await self._read(self._get_user_stats, guild_id, user_id)
+    
+    async def adopt_legacy_rows(self, guild_id):
+        """Atribui a `guild_id` os casos e tickets anteriores ao suporte a vários servidores
+        
+        Retorna quantos registros foram atribuídos. Sem `guild_id` (GUILD_ID
+        não definido) os registros ficam sem servidor, e fora das consultas.
+        """
+        return await self._run(self._adopt_legacy_rows, guild_id)
+    
+    # Implementações síncronas (executadas na thread do banco)
+    @staticmethod
+    def _create_ticket(conn, ticket_id, user_id, channel_id, category, guild_id):
+        conn.execute('''
+            INSERT INTO tickets (ticket_id, user_id, channel_id, category, messages_captured, guild_id)
+            VALUES (?, ?, ?, ?, true, ?)
+        ''', (ticket_id, user_id, channel_id, category, guild_id))
+    
+    @staticmethod
+    def _close_ticket(conn, ticket_id, closed_by, reason):
+        conn.execute('''
+            UPDATE tickets 
+            SET status = 'closed', closed_at = CURRENT_TIMESTAMP, 
+                closed_by = ?, reason = ?
+            WHERE ticket_id = ?
+        ''', (closed_by, reason, ticket_id))
+    
+    @staticmethod
+    def _reopen_ticket(conn, ticket_id):
+        conn.execute("UPDATE tickets SET status = 'open', closed_at = NULL WHERE ticket_id = ?", 
+                     (ticket_id,))
+    
+    @staticmethod
+    def _get_ticket(conn, ticket_id):
+        cursor = conn.execute('SELECT * FROM tickets WHERE ticket_id = ?', (ticket_id,))
+        return cursor.fetchone()
+    
+    @staticmethod
+    def _get_open_tickets(conn, scope):
+        clause, params = shard_filter(scope)
+        cursor = conn.execute(f'''
+            SELECT ticket_id, user_id, guild_id FROM tickets
+            WHERE status = 'open'{clause}
+        ''', params)
+        return cursor.fetchall()
+    
+    @staticmethod
+    def _get_purgeable_tickets(conn, default_days, limit, scope):
+        # O menor prazo entre as políticas limita a faixa do índice parcial;
+        # o prazo de cada servidor é aplicado linha a linha
+        min_days = conn.execute(
+            'SELECT MIN(retention_days) FROM settings WHERE retention_days IS NOT NULL'
+        ).fetchone()[0]
+        min_days = min(default_days, min_days) if min_days is not None else default_days
+        
+        clause, params = shard_filter(scope, 't.guild_id')
+        cursor = conn.execute(f'''
+            SELECT t.ticket_id, t.channel_id, t.guild_id
+            FROM tickets t LEFT JOIN settings s ON s.guild_id = t.guild_id
+            WHERE t.status = 'closed' AND t.purged_at IS NULL
+            AND t.closed_at < datetime('now', ?)
+            AND t.closed_at < datetime('now', '-' || COALESCE(s.retention_days, ?) || ' days'){clause}
+            ORDER BY t.closed_at
+            LIMIT ?
+        ''', (f'-{int(min_days)} days', default_days, *params, limit))
+        return cursor.fetchall()
+    
+    @staticmethod
+    def _mark_tickets_purged(conn, ticket_ids):
+        conn.executemany('UPDATE tickets SET purged_at = CURRENT_TIMESTAMP WHERE ticket_id = ?',
+                         [(ticket_id,) for ticket_id in ticket_ids])
+    
+    @staticmethod
+    def _get_channel_ticket_id(conn, channel_id):
+        row = conn.execute('SELECT ticket_id FROM tickets WHERE channel_id = ?', (channel_id,)).fetchone()
+        return row['ticket_id'] if row else None
+    
+    @staticmethod
+    def _get_ticket_channel_ids(conn, channel_ids):
+        """Quais dos canais dados já pertencem a algum ticket"""
+        placeholders = ', '.join('?' * len(channel_ids))
+        cursor = conn.execute(f'SELECT channel_id FROM tickets WHERE channel_id IN ({placeholders})',
+                              list(channel_ids))
+        return {row['channel_id'] for row in cursor}
+    
+    @staticmethod
+    def _save_ticket_messages(conn, inserts, edits, deletes):
+        conn.executemany('''
+            INSERT OR IGNORE INTO ticket_messages
+                (ticket_id, message_id, user_id, author_name, message, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', inserts)
+        conn.executemany('''
+            UPDATE ticket_messages SET message = ?, edited_at = ? WHERE message_id = ?
+        ''', edits)
+        conn.executemany('''
+            UPDATE ticket_messages SET deleted_at = ? WHERE message_id = ?
+        ''', deletes)
+    
+    @staticmethod
+    def _get_ticket_messages(conn, ticket_id, after_id, limit):
+        cursor = conn.execute('''
+            SELECT id, user_id, author_name, message, timestamp, edited_at, deleted_at
+            FROM ticket_messages
+            WHERE ticket_id = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (ticket_id, after_id, limit))
+        return cursor.fetchall()
+    
+    @staticmethod
+    def _get_ticket_message_stats(conn, ticket_id):
+        cursor = conn.execute('''
+            SELECT COUNT(*) AS messages, COUNT(DISTINCT user_id) AS participants,
+                   MAX(timestamp) AS last_message
+            FROM ticket_messages
+            WHERE ticket_id = ? AND deleted_at IS NULL
+        ''', (ticket_id,))
+        return cursor.fetchone()
+    
+    @staticmethod
+    def _get_last_ticket_message_id(conn, ticket_id):
+        cursor = conn.execute('SELECT MAX(message_id) FROM ticket_messages WHERE ticket_id = ?', (ticket_id,))
+        return cursor.fetchone()[0]
+    
+    @staticmethod
+    def _get_captured_open_tickets(conn, scope):
+        clause, params = shard_filter(scope, 't.guild_id')
+        cursor = conn.execute(f'''
+            SELECT t.ticket_id, t.channel_id,
+                   (SELECT MAX(message_id) FROM ticket_messages tm WHERE tm.ticket_id = t.ticket_id) AS last_message_id
+            FROM tickets t
+            WHERE t.status = 'open' AND t.messages_captured{clause}
+        ''', params)
+        return cursor.fetchall()
+    
+    @staticmethod
+    def _add_mod_action(conn, case_id, user_id, moderator_id, action, reason, duration, guild_id):
+        conn.execute('''
+            INSERT INTO moderation (case_id, user_id, moderator_id, action, reason, duration, guild_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (case_id, user_id, moderator_id, action, reason, duration, guild_id))
+    
+    @staticmethod
+    def _add_mod_actions(conn, cases):
+        conn.executemany('''
+            INSERT INTO moderation (case_id, user_id, moderator_id, action, reason, duration, guild_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', cases)
+    
+    @staticmethod
+    def _get_case(conn, guild_id, case_id):
+        cursor = conn.execute('SELECT * FROM moderation WHERE case_id = ? AND guild_id = ?', (case_id, guild_id))
+        return cursor.fetchone()
+    
+    @staticmethod
+    def _get_user_warnings(conn, guild_id, user_id):
+        cursor = conn.execute('''
+            SELECT * FROM moderation 
+            WHERE user_id = ? AND action = 'warn' AND active = true AND guild_id = ?
+        ''', (user_id, guild_id))
+        return cursor.fetchall()
+    
+    @staticmethod
+    def _get_guild_settings(conn, guild_id):
+        if guild_id is None:
+            return conn.execute('SELECT * FROM settings').fetchall()
+        return conn.execute('SELECT * FROM settings WHERE guild_id = ?', (guild_id,)).fetchall()
+    
+    @staticmethod
+    def _set_guild_setting(conn, guild_id, column, value):
+        # `column` já foi validada contra SETTINGS_COLUMNS
+        conn.execute(f'''
+            INSERT INTO settings (guild_id, {column}) VALUES (?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET {column} = excluded.{column}
+        ''', (guild_id, value))
+    
+    @staticmethod
+    def _add_automod_rule(conn, guild_id, kind, pattern, action, created_by):
+        cursor = conn.execute('''
+            INSERT INTO automod_rules (guild_id, kind, pattern, action, created_by)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (guild_id, kind, pattern, action, created_by))
+        return cursor.lastrowid
+    
+    @staticmethod
+    def _delete_automod_rule(conn, guild_id, rule_id):
+        cursor = conn.execute('DELETE FROM automod_rules WHERE guild_id = ? AND id = ?', (guild_id, rule_id))
+        return cursor.rowcount > 0
+    
+    @staticmethod
+    def _get_automod_rules(conn, guild_id):
+        if guild_id is None:
+            return conn.execute('SELECT * FROM automod_rules').fetchall()
+        return conn.execute('SELECT * FROM automod_rules WHERE guild_id = ?', (guild_id,)).fetchall()
+    
+    @staticmethod
+    def _save_mute_provisioning(conn, guild_id, role_id, cursor, done):
+        conn.execute('''
+            INSERT INTO mute_provisioning (guild_id, role_id, cursor, done) VALUES (?, ?, ?, ?)
+            ON CONFLICT (guild_id) DO UPDATE SET
+                role_id = excluded.role_id, cursor = excluded.cursor, done = excluded.done,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (guild_id, role_id, cursor, done))
+    
+    @staticmethod
+    def _get_pending_mute_provisioning(conn, scope):
+        clause, params = shard_filter(scope)
+        return conn.execute(f'''
+            SELECT guild_id, role_id, cursor FROM mute_provisioning WHERE NOT done{clause}
+        ''', params).fetchall()
+    
+    @staticmethod
+    def _fts_query(text):
+        """Converte texto livre numa consulta FTS5 segura (termos entre aspas, AND implícito)"""
+        terms = []
+        for term in text.split():
+            prefix = term.endswith('*')
+            term = term.rstrip('*').replace('"', '""')
+            if term:
+                terms.append(f'"{term}"*' if prefix else f'"{term}"')
+        return ' '.join(terms)
+    
+    @staticmethod
+    def _search_filters(filters):
+        clauses, params = [], []
+        for clause, value in filters:
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return clauses, params
+    
+    @staticmethod
+    def _search_cases(conn, guild_id, text, user_id, moderator_id, action, since, until, limit, offset):
+        clauses, params = Database._search_filters([
+            ('m.user_id = ?', user_id),
+            ('m.moderator_id = ?', moderator_id),
+            ('m.action = ?', action),
+            ('m.created_at >= ?', since),
+            ('m.created_at < ?', until),
+        ])
+        # Sempre restrita ao servidor de quem pesquisa
+        clauses.insert(0, 'm.guild_id = ?')
+        params.insert(0, guild_id)
+        query = Database._fts_query(text or '')
+        if query:
+            sql = '''
+                SELECT m.*, bm25(moderation_fts) AS rank
+                FROM moderation_fts JOIN moderation m ON m.id = moderation_fts.rowid
+                WHERE moderation_fts MATCH ?''' + ''.join(f' AND {c}' for c in clauses) + '''
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            '''
+            params = [query] + params
+        else:
+            sql = '''
+                SELECT m.*, 0 AS rank FROM moderation m
+                WHERE ''' + ' AND '.join(clauses) + '''
+                ORDER BY m.id DESC
+                LIMIT ? OFFSET ?
+            '''
+        return conn.execute(sql, params + [limit, offset]).fetchall()
+    
+    @staticmethod
+    def _search_ticket_messages(conn, guild_id, text, user_id, since, until, limit, offset):
+        clauses, params = Database._search_filters([
+            ('tm.user_id = ?', user_id),
+            ('tm.timestamp >= ?', since),
+            ('tm.timestamp < ?', until),
+        ])
+        clauses.insert(0, 't.guild_id = ?')
+        params.insert(0, guild_id)
+        clauses.append('tm.deleted_at IS NULL')
+        query = Database._fts_query(text or '')
+        if query:
+            sql = '''
+                SELECT tm.*, bm25(ticket_messages_fts) AS rank
+                FROM ticket_messages_fts JOIN ticket_messages tm ON tm.id = ticket_messages_fts.rowid
+                JOIN tickets t ON t.ticket_id = tm.ticket_id
+                WHERE ticket_messages_fts MATCH ?''' + ''.join(f' AND {c}' for c in clauses) + '''
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            '''
+            params = [query] + params
+        else:
+            sql = '''
+                SELECT tm.*, 0 AS rank FROM ticket_messages tm
+                JOIN tickets t ON t.ticket_id = tm.ticket_id
+                WHERE ''' + ' AND '.join(clauses) + '''
+                ORDER BY tm.id DESC
+                LIMIT ? OFFSET ?
+            '''
+        return conn.execute(sql, params + [limit, offset]).fetchall()
+    
+    @staticmethod
+    def _add_scheduled_task(conn, kind, guild_id, target_id, channel_id, run_at):
+        cursor = conn.execute('''
+            INSERT INTO scheduled_tasks (kind, guild_id, target_id, channel_id, run_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (kind, guild_id, target_id, channel_id, run_at))
+        return cursor.lastrowid
+    
+    @staticmethod
+    def _delete_scheduled_task(conn, task_id):
+        conn.execute('DELETE FROM scheduled_tasks WHERE id = ?', (task_id,))
+    
+    @staticmethod
+    def _get_scheduled_tasks(conn, scope):
+        clause, params = shard_filter(scope)
+        cursor = conn.execute(f'''
+            SELECT id, kind, guild_id, target_id, channel_id, run_at FROM scheduled_tasks
+            WHERE 1 = 1{clause}
+        ''', params)
+        return cursor.fetchall()
+    
+    @staticmethod
+    def _get_counters(conn):
+        return conn.execute('SELECT guild_id, metric, value FROM stats_counters').fetchall()
+    
+    @staticmethod
+    def _get_hourly_stats(conn, guild_id, hours):
+        cursor = conn.execute('''
+            SELECT metric, SUM(value) AS value FROM stats_hourly
+            WHERE guild_id = ? AND bucket >= strftime('%Y-%m-%d %H:00', 'now', ?)
+            GROUP BY metric
+        ''', (guild_id, f'-{int(hours)} hours'))
+        return {row['metric']: row['value'] for row in cursor.fetchall()}
+    
+    @staticmethod
+    def _adopt_legacy_rows(conn, guild_id):
+        legacy = conn.execute('''
+            SELECT (SELECT COUNT(*) FROM tickets WHERE guild_id IS NULL)
+                 + (SELECT COUNT(*) FROM moderation WHERE guild_id IS NULL)
+        ''').fetchone()[0]
+        if not legacy:
+            return 0
+        if not guild_id:
+            logger.error(f"{legacy} casos/tickets antigos sem servidor: defina GUILD_ID com o ID "
+                         f"do servidor principal para que voltem a aparecer")
+            return 0
+        
+        conn.execute('UPDATE tickets SET guild_id = ? WHERE guild_id IS NULL', (guild_id,))
+        conn.execute('UPDATE moderation SET guild_id = ? WHERE guild_id IS NULL', (guild_id,))
+        
+        # Os contadores desses registros foram somados no servidor 0 (COALESCE nos triggers)
+        conn.execute('''
+            INSERT INTO stats_counters (guild_id, metric, value)
+            SELECT ?, metric, value FROM stats_counters WHERE guild_id = 0
+            ON CONFLICT (guild_id, metric) DO UPDATE SET value = value + excluded.value
+        ''', (guild_id,))
+        conn.execute('''
+            INSERT INTO stats_hourly (guild_id, bucket, metric, value)
+            SELECT ?, bucket, metric, value FROM stats_hourly WHERE guild_id = 0
+            ON CONFLICT (guild_id, bucket, metric) DO UPDATE SET value = value + excluded.value
+        ''', (guild_id,))
+        conn.execute('DELETE FROM stats_counters WHERE guild_id = 0')
+        conn.execute('DELETE FROM stats_hourly WHERE guild_id = 0')
+        logger.info(f"{legacy} casos/tickets antigos atribuídos ao servidor {guild_id}")
+        return legacy
+    
+    @staticmethod
+    def _get_user_stats(conn, guild_id, user_id):
+        ticket_count = conn.execute(
+            'SELECT COUNT(*) FROM tickets WHERE user_id = ? AND guild_id = ?', (user_id, guild_id)).fetchone()[0]
+        warning_count = conn.execute('''
+            SELECT COUNT(*) FROM moderation 
+            WHERE user_id = ? AND action = 'warn' AND active = true AND guild_id = ?
+        ''', (user_id, guild_id)).fetchone()[0]
+        return ticket_count, warning_count
@@ -0,0 +1,127 @@
+import discord
+from discord.ext import commands
+import random
+
+class General(commands.Cog):
+    """Comandos gerais e de diversão (carregados sob demanda)"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @commands.command(name="ajuda")
+    async def ajuda(self, ctx):
+        """Mostra ajuda"""
+        prefix = ctx.clean_prefix
+        embed = discord.Embed(
+            title="📚 Ajuda",
+            description=f"Prefixo: `{prefix}`",
+            color=0x5865F2
+        )
+        
+        embed.add_field(
+            name="📋 Comandos Básicos",
+            value=(
+                f"`{prefix}ping` - Testa o bot\n"
+                f"`{prefix}userinfo` - Suas informações\n"
+                f"`{prefix}avatar` - Seu avatar\n"
+                f"`{prefix}serverinfo` - Info do servidor\n"
+                f"`{prefix}say [texto]` - Repete texto\n"
+                f"`{prefix}ajuda` - Esta mensagem"
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="🛡️ Moderação",
+            value=(
+                f"`{prefix}warn`, `{prefix}mute`, `{prefix}unmute`, `{prefix}kick`, `{prefix}ban`\n"
+                f"`{prefix}massban`, `{prefix}masskick`, `{prefix}clear` (`{prefix}limpar`)\n"
+                f"`{prefix}warnings`, `{prefix}case`, `{prefix}search-cases`"
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="🎫 Tickets",
+            value=f"`{prefix}ticket-info`, `{prefix}add-user`, `{prefix}remove-user`, `{prefix}search-tickets`",
+            inline=False
+        )
+        embed.add_field(
+            name="🎲 Diversão",
+            value=f"`{prefix}dado [lados]`, `{prefix}moeda`, `{prefix}sorte [pergunta]`",
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name="avatar")
+    async def avatar(self, ctx, member: discord.Member = None):
+        """Mostra avatar"""
+        member = member or ctx.author
+        
+        embed = discord.Embed(
+            title=f"🖼️ Avatar de {member.name}",
+            color=0x5865F2
+        )
+        
+        if member.avatar:
+            embed.set_image(url=member.avatar.url)
+            embed.description = f"[Link]({member.avatar.url})"
+        else:
+            embed.set_image(url=member.default_avatar.url)
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name="serverinfo")
+    async def serverinfo(self, ctx):
+        """Informações do servidor"""
+        guild = ctx.guild
+        
+        embed = discord.Embed(
+            title=f"🏰 {guild.name}",
+            color=0x9b59b6
+        )
+        
+        if guild.icon:
+            embed.set_thumbnail(url=guild.icon.url)
+        
+        embed.add_field(name="👑 Dono", value=f"<@{guild.owner_id}>", inline=True)
+        embed.add_field(name="👥 Membros", value=guild.member_count, inline=True)
+        embed.add_field(name="📅 Criado em", value=guild.created_at.strftime("%d/%m/%Y"), inline=True)
+        
+        text = len(guild.text_channels)
+        voice = len(guild.voice_channels)
+        embed.add_field(name="📁 Canais", value=f"Texto: {text}\nVoz: {voice}", inline=True)
+        
+        embed.add_field(name="😀 Emojis", value=len(guild.emojis), inline=True)
+        embed.add_field(name="🎭 Cargos", value=len(guild.roles), inline=True)
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name="say")
+    async def say(self, ctx, *, texto):
+        """Faz o bot falar"""
+        await ctx.send(texto, allowed_mentions=discord.AllowedMentions.none())
+    
+    @commands.command(name="dado")
+    async def dado(self, ctx, lados: int = 6):
+        """Rola um dado"""
+        if lados < 2:
+            lados = 6
+        
+        resultado = random.randint(1, lados)
+        await ctx.send(f"🎲 {ctx.author.mention} rolou um D{lados}: **{resultado}**")
+    
+    @commands.command(name="moeda")
+    async def moeda(self, ctx):
+        """Cara ou coroa"""
+        resultado = random.choice(["cara", "coroa"])
+        await ctx.send(f"🪙 {ctx.author.mention} deu: **{resultado}**")
+    
+    @commands.command(name="sorte")
+    async def sorte(self, ctx, *, pergunta):
+        """Responde sim/não"""
+        respostas = ["Sim", "Não", "Talvez", "Claro que sim!", "Nunca", "Com certeza"]
+        resposta = random.choice(respostas)
+        await ctx.send(f"🎱 {ctx.author.mention} perguntou: '{pergunta}'\nResposta: **{resposta}**")
+
+async def setup(bot):
+    await bot.add_cog(General(bot))
@@ -0,0 +1,171 @@
+import discord
+from discord.ext import commands
+import asyncio
+from config import Config
+
+# chave -> (coluna na tabela settings, tipo, padrão global do Config)
+SETTINGS = {
+    'admin_role': ('admin_role', 'role', Config.ADMIN_ROLE),
+    'mod_role': ('mod_role', 'role', Config.MOD_ROLE),
+    'support_role': ('support_role', 'role', Config.SUPPORT_ROLE),
+    'mod_log_channel': ('log_channel', 'channel', Config.MOD_LOG_CHANNEL),
+    'ticket_log_channel': ('ticket_log_channel', 'channel', Config.TICKET_LOG_CHANNEL),
+    'ticket_category': ('ticket_category', 'category', Config.TICKET_CATEGORY),
+    'closed_category': ('closed_category', 'category', Config.CLOSED_CATEGORY),
+    'max_tickets': ('max_tickets', 'int', Config.MAX_TICKETS_PER_USER),
+    'retention_days': ('retention_days', 'int', Config.AUTO_CLOSE_DAYS),
+}
+
+class GuildSettings:
+    """Configurações por servidor em memória, com escrita direta no banco
+    
+    Todas as linhas da tabela `settings` são carregadas uma vez; leituras
+    são consultas O(1) a um dict, sem acesso ao banco. Valores não
+    definidos caem no padrão global do Config.
+    """
+    
+    def __init__(self, db):
+        self.db = db
+        self._guilds = {}  # guild_id -> {chave: valor}
+        self._loading = None
+    
+    async def load(self):
+        """Carrega o cache (chamadas simultâneas compartilham a mesma leitura)"""
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+        await self._loading
+    
+    async def _load(self):
+        guilds = {}
+        for row in await self.db.get_guild_settings():
+            guilds[row['guild_id']] = self._from_row(row)
+        self._guilds = guilds
+    
+    async def refresh(self, guild_id):
+        """Invalida o cache de um servidor relendo sua linha do banco"""
+        rows = await self.db.get_guild_settings(guild_id)
+        if rows:
+            self._guilds[guild_id] = self._from_row(rows[0])
+        else:
+            self._guilds.pop(guild_id, None)
+    
+    @staticmethod
+    def _from_row(row):
+        return {key: row[column] for key, (column, _, _) in SETTINGS.items() if row[column] is not None}
+    
+    def get(self, guild_id, key):
+        values = self._guilds.get(guild_id)
+        if values and key in values:
+            return values[key]
+        return SETTINGS[key][2]
+    
+    def overrides(self, guild_id):
+        return dict(self._guilds.get(guild_id, {}))
+    
+    async def set(self, guild_id, key, value):
+        """Grava no banco e, só depois de gravado, atualiza o cache"""
+        await self.db.set_guild_setting(guild_id, SETTINGS[key][0], value)
+        values = self._guilds.setdefault(guild_id, {})
+        if value is None:
+            values.pop(key, None)
+        else:
+            values[key] = value
+    
+    def has_role(self, member, *keys):
+        """Se o membro tem algum dos cargos configurados nas chaves dadas"""
+        role_ids = {self.get(member.guild.id, key) for key in keys}
+        return any(role.id in role_ids for role in member.roles)
+
+async def setup_settings(bot):
+    """Cria e carrega o cache compartilhado em `bot.settings`"""
+    if not hasattr(bot, 'settings'):
+        bot.settings = GuildSettings(bot.db)
+    await bot.settings.load()
+
+def guild_role(*keys):
+    """Equivalente a `commands.has_any_role`, com os cargos do servidor atual"""
+    async def predicate(ctx):
+        if not ctx.guild:
+            raise commands.NoPrivateMessage()
+        if ctx.bot.settings.has_role(ctx.author, *keys):
+            return True
+        raise commands.MissingAnyRole([ctx.bot.settings.get(ctx.guild.id, key) for key in keys])
+    return commands.check(predicate)
+
+class Settings(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+    
+    async def cog_load(self):
+        await setup_settings(self.bot)
+    
+    def format_value(self, key, value):
+        kind = SETTINGS[key][1]
+        if not value:
+            return "Não definido"
+        if kind == 'role':
+            return f"<@&{value}>"
+        if kind in ('channel', 'category'):
+            return f"<#{value}>"
+        return str(value)
+    
+    async def parse_value(self, ctx, key, value):
+        kind = SETTINGS[key][1]
+        if kind == 'role':
+            return (await commands.RoleConverter().convert(ctx, value)).id
+        if kind == 'channel':
+            return (await commands.TextChannelConverter().convert(ctx, value)).id
+        if kind == 'category':
+            return (await commands.CategoryChannelConverter().convert(ctx, value)).id
+        if not value.isdigit() or int(value) < 1:
+            raise commands.BadArgument(f"`{key}` precisa ser um número inteiro positivo.")
+        return int(value)
+    
+    @commands.group(name="config", invoke_without_command=True)
+    @commands.has_permissions(administrator=True)
+    async def config(self, ctx):
+        """Mostra as configurações deste servidor"""
+        overrides = self.bot.settings.overrides(ctx.guild.id)
+        embed = discord.Embed(
+            title=f"⚙️ Configurações de {ctx.guild.name}",
+            description=f"Use `{ctx.clean_prefix}config set <chave> <valor>` ou "
+                        f"`{ctx.clean_prefix}config reset <chave>`.",
+            color=Config.COLORS['info']
+        )
+        for key in SETTINGS:
+            value = self.format_value(key, self.bot.settings.get(ctx.guild.id, key))
+            embed.add_field(name=key, value=value if key in overrides else f"{value} (padrão)")
+        await ctx.send(embed=embed)
+    
+    @config.command(name="set")
+    @commands.has_permissions(administrator=True)
+    async def config_set(self, ctx, key: str, *, value: str):
+        """Altera uma configuração deste servidor"""
+        key = key.lower()
+        if key not in SETTINGS:
+            await ctx.send(f"❌ Chave inválida. Opções: {', '.join(f'`{k}`' for k in SETTINGS)}")
+            return
+        
+        parsed = await self.parse_value(ctx, key, value)
+        await self.bot.settings.set(ctx.guild.id, key, parsed)
+        
+        embed = discord.Embed(
+            description=f"✅ `{key}` agora é {self.format_value(key, parsed)}.",
+            color=Config.COLORS['success']
+        )
+        await ctx.send(embed=embed)
+    
+    @config.command(name="reset")
+    @commands.has_permissions(administrator=True)
+    async def config_reset(self, ctx, key: str):
+        """Volta uma configuração ao padrão global"""
+        key = key.lower()
+        if key not in SETTINGS:
+            await ctx.send(f"❌ Chave inválida. Opções: {', '.join(f'`{k}`' for k in SETTINGS)}")
+            return
+        
+        await self.bot.settings.set(ctx.guild.id, key, None)
+        await ctx.send(f"✅ `{key}` voltou ao padrão.")
+
+async def setup(bot):
+    await bot.add_cog(Settings(bot))
@@ -0,0 +1,80 @@
+import threading
+import time
+from datetime import datetime, timezone
+from config import Config
+
+# Base32 de Crockford: sem I, L, O e U, para evitar confusão ao digitar
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+DECODE = {char: value for value, char in enumerate(ALPHABET)}
+DECODE.update({'I': 1, 'L': 1, 'O': 0})
+
+EPOCH_MS = 1704067200000  # 2024-01-01 00:00 UTC
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+ID_LENGTH = 13  # 64 bits em base32 (5 bits por caractere)
+
+class IdGenerator:
+    """IDs de 64 bits ordenados pelo tempo, no estilo Snowflake
+    
+    Layout: 42 bits de milissegundos desde EPOCH_MS, 10 bits do worker
+    (um por processo) e 12 bits de sequência dentro do mesmo
+    milissegundo. Codificados em base32 com tamanho fixo, a ordem
+    alfabética dos IDs é a ordem cronológica.
+    """
+    
+    def __init__(self, worker_id=None):
+        worker_id = Config.ID_WORKER_ID if worker_id is None else worker_id
+        if not 0 <= worker_id < 1 << WORKER_BITS:
+            raise ValueError(f"worker_id deve estar entre 0 e {(1 << WORKER_BITS) - 1}")
+        self.worker_id = worker_id
+        self._last_ms = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+    
+    def next_int(self):
+        with self._lock:
+            now = int(time.time() * 1000) - EPOCH_MS
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                # Mesmo milissegundo (ou relógio atrasado): nunca repetir nem voltar
+                self._sequence = (self._sequence + 1) & ((1 << SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    self._last_ms += 1
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+    
+    def next_id(self):
+        return encode(self.next_int())
+
+def encode(value):
+    chars = []
+    for _ in range(ID_LENGTH):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+def decode(text):
+    value = 0
+    for char in text.upper():
+        value = (value << 5) | DECODE[char]
+    return value
+
+def is_time_id(text):
+    """Distingue os IDs ordenados pelo tempo dos IDs aleatórios antigos"""
+    return len(text) == ID_LENGTH and all(char in DECODE for char in text.upper())
+
+def id_time(text):
+    """Momento (UTC) em que o ID foi gerado"""
+    ms = (decode(text) >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+def id_floor(moment):
+    """Menor ID possível no instante dado, para consultas por intervalo de IDs"""
+    ms = max(int(moment.timestamp() * 1000) - EPOCH_MS, 0)
+    return encode(ms << (WORKER_BITS + SEQUENCE_BITS))
+
+_generator = IdGenerator()
+
+def new_id():
+    return _generator.next_id()
@@ -0,0 +1,117 @@
+"""Inicia o bot em vários processos, cada um com uma faixa de shards
+
+Uso: python launcher.py [--processes N] [--shards N]
+
+Cada processo roda main.py com SHARDING=true, SHARD_COUNT, SHARD_IDS e um
+ID_WORKER_ID próprio (para os IDs de casos/tickets não colidirem). O
+estado compartilhado fica no banco SQLite (WAL): tarefas agendadas e
+limpeza de tickets são filtradas pelos shards de cada processo.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import aiohttp
+from config import Config
+
+logger = logging.getLogger('launcher')
+
+IDENTIFY_INTERVAL = 5  # segundos entre IDENTIFYs no gateway (max_concurrency = 1)
+
+def plan_clusters(shard_count, processes):
+    """Divide os shards em faixas contíguas, uma por processo"""
+    processes = max(1, min(processes, shard_count))
+    size, extra = divmod(shard_count, processes)
+    clusters, start = [], 0
+    for index in range(processes):
+        end = start + size + (1 if index < extra else 0)
+        clusters.append(list(range(start, end)))
+        start = end
+    return clusters
+
+async def recommended_shards(token):
+    """Número de shards recomendado pelo Discord para este bot"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get('https://discord.com/api/v10/gateway/bot',
+                               headers={'Authorization': f'Bot {token}'}) as response:
+            response.raise_for_status()
+            return (await response.json())['shards']
+
+class Cluster:
+    """Um processo filho com uma faixa de shards, reiniciado se cair"""
+    
+    def __init__(self, index, shard_ids, shard_count, script):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.script = script
+        self.process = None
+        self.restarts = 0
+    
+    @property
+    def name(self):
+        return f"cluster {self.index} (shards {self.shard_ids[0]}-{self.shard_ids[-1]})"
+    
+    async def run(self, delay, stopping):
+        await asyncio.sleep(delay)
+        backoff = 1
+        while not stopping.is_set():
+            env = dict(os.environ,
+                       SHARDING='true',
+                       SHARD_COUNT=str(self.shard_count),
+                       SHARD_IDS=f"{self.shard_ids[0]}-{self.shard_ids[-1]}",
+                       ID_WORKER_ID=str(self.index))
+            self.process = await asyncio.create_subprocess_exec(sys.executable, self.script, env=env)
+            logger.info(f"{self.name} iniciado (pid {self.process.pid})")
+            
+            code = await self.process.wait()
+            if stopping.is_set():
+                break
+            
+            self.restarts += 1
+            logger.warning(f"{self.name} saiu com código {code}; reiniciando em {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+    
+    def terminate(self):
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+
+async def launch(processes, shard_count, script='main.py'):
+    if not shard_count:
+        shard_count = await recommended_shards(Config.TOKEN)
+    clusters = [Cluster(i, ids, shard_count, script) for i, ids in enumerate(plan_clusters(shard_count, processes))]
+    logger.info(f"{shard_count} shards em {len(clusters)} processos")
+    
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    
+    # Escalonar os inícios: cada shard precisa do seu intervalo de IDENTIFY
+    runners, delay = [], 0
+    for cluster in clusters:
+        runners.append(asyncio.create_task(cluster.run(delay, stopping)))
+        delay += len(cluster.shard_ids) * IDENTIFY_INTERVAL
+    
+    await stopping.wait()
+    logger.info("Encerrando os processos...")
+    for cluster in clusters:
+        cluster.terminate()
+    await asyncio.gather(*runners, return_exceptions=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inicia o bot em vários processos com shards")
+    parser.add_argument('--processes', type=int, default=Config.SHARD_PROCESSES)
+    parser.add_argument('--shards', type=int, default=Config.SHARD_COUNT,
+                        help="total de shards (0 = recomendado pelo Discord)")
+    parser.add_argument('--script', default='main.py')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(name)s] %(message)s')
+    asyncio.run(launch(args.processes, args.shards, args.script))
+
+if __name__ == '__main__':
+    main()
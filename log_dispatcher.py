@@ -0,0 +1,117 @@
+import discord
+import asyncio
+import logging
+from collections import defaultdict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+class LogDispatcher:
+    """Fila de embeds de log enviada em segundo plano
+    
+    `send` só enfileira; a cada `interval` segundos os embeds pendentes de
+    cada canal são agrupados em mensagens de até 10 embeds (respeitando o
+    limite de 6000 caracteres). Falhas por rate limit (429) ou erro do
+    servidor são repetidas com backoff exponencial.
+    """
+    
+    def __init__(self, bot, interval=None, max_queue=None, max_retries=None):
+        self.bot = bot
+        self.interval = interval or Config.LOG_FLUSH_INTERVAL
+        self.max_retries = max_retries or Config.LOG_MAX_RETRIES
+        self._queue = asyncio.Queue(maxsize=max_queue or Config.LOG_MAX_QUEUE)
+        self._ready = asyncio.Event()
+        self._task = None
+        self.sent_embeds = 0
+        self.sent_messages = 0
+        self.dropped = 0
+    
+    def send(self, channel_id, embed):
+        """Enfileira um embed para o canal de log (não bloqueia)"""
+        if not channel_id:
+            return
+        
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+        try:
+            self._queue.put_nowait((channel_id, embed))
+            self._ready.set()
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Fila de logs cheia; embed para o canal {channel_id} descartado")
+    
+    async def stop(self):
+        """Envia o que estiver pendente e encerra o worker"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+    
+    def stats(self):
+        return {
+            'pending': self._queue.qsize(), 'embeds': self.sent_embeds,
+            'messages': self.sent_messages, 'dropped': self.dropped
+        }
+    
+    async def flush(self):
+        pending = defaultdict(list)
+        while not self._queue.empty():
+            channel_id, embed = self._queue.get_nowait()
+            pending[channel_id].append(embed)
+        
+        await asyncio.gather(*(self._deliver(channel_id, embeds) for channel_id, embeds in pending.items()))
+    
+    @staticmethod
+    def pack(embeds):
+        """Agrupa embeds em lotes que cabem numa única mensagem"""
+        batch, size = [], 0
+        for embed in embeds:
+            length = len(embed)
+            if batch and (len(batch) == MAX_EMBEDS_PER_MESSAGE or size + length > MAX_EMBED_CHARS_PER_MESSAGE):
+                yield batch
+                batch, size = [], 0
+            batch.append(embed)
+            size += length
+        if batch:
+            yield batch
+    
+    async def _deliver(self, channel_id, embeds):
+        # Canais diferentes são enviados em paralelo; mensagens do mesmo canal em ordem
+        channel = self.bot.get_channel(channel_id)
+        if not channel:
+            return
+        
+        for batch in self.pack(embeds):
+            await self._send_with_retry(channel, batch)
+    
+    async def _send_with_retry(self, channel, batch):
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            try:
+                await channel.send(embeds=batch)
+                self.sent_embeds += len(batch)
+                self.sent_messages += 1
+                return
+            except discord.HTTPException as e:
+                if (e.status != 429 and e.status < 500) or attempt == self.max_retries:
+                    logger.error(f"Falha ao enviar {len(batch)} logs para #{channel}: {e}")
+                    return
+                
+                # Nunca esperar menos que o Retry-After informado pela API
+                headers = getattr(e.response, 'headers', None) or {}
+                await asyncio.sleep(max(float(headers.get('Retry-After', 0)), delay))
+                delay *= 2
+    
+    async def _run(self):
+        while True:
+            # Aguardar o primeiro evento e dar tempo para outros se acumularem
+            await self._ready.wait()
+            await asyncio.sleep(self.interval)
+            self._ready.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erro no envio de logs: {e}")
@@ -1,208 +1,194 @@
 import discord
 from discord.ext import commands
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import asyncio
+import logging
+import time
+from config import Config
+from database import Database
+from guild_settings import GuildSettings
+from scheduler import Scheduler
+from resolver import UserResolver
+from log_dispatcher import LogDispatcher
+from ticket_index import OpenTicketIndex
+from ticket_pool import TicketChannelPool
+from sharding import parse_shard_ids, shard_scope
+from metrics import MetricsServer, COMMAND_SECONDS, COMMAND_ERRORS, rest_trace
+
+STARTED_AT = time.perf_counter()
+
+logger = logging.getLogger('bot')
 
 # Configuração
-TOKEN = os.getenv('DISCORD_TOKEN')
 PREFIX = '.'
 
-# Bot com intents mínimos
-intents = discord.Intents.default()
-intents.message_content = True  # Apenas para ler mensagens
+# Extensões carregadas no início (têm listeners ou views persistentes)
+EXTENSIONS = ['moderation', 'tickets', 'utils', 'automod', 'antispam']
+
+# Extensões só com comandos raros: carregadas no primeiro uso de um deles
+LAZY_EXTENSIONS = {
+    'search': ['search-cases', 'search-tickets'],
+    'guild_settings': ['config'],
+    'general': ['ajuda', 'avatar', 'serverinfo', 'say', 'dado', 'moeda', 'sorte'],
+}
 
-bot = commands.Bot(
-    command_prefix=PREFIX,
-    intents=intents,
-    help_command=None
-)
+# Intents: conteúdo das mensagens (comandos, automod) e membros (antispam, massban)
+intents = discord.Intents.default()
+intents.message_content = True
+intents.members = True
+
+class ModerationBotMixin:
+    """Pipeline de inicialização e carregamento sob demanda de extensões"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.startup_timings = {}
+        self._lazy_commands = {name: ext for ext, names in LAZY_EXTENSIONS.items() for name in names}
+        self._lazy_lock = asyncio.Lock()
+    
+    async def timed(self, phase, coro):
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.startup_timings[phase] = time.perf_counter() - start
+    
+    async def setup_hook(self):
+        # 1. Banco e serviços compartilhados, criados uma única vez
+        # Database() roda init_db (migrações) no construtor: criar fora do event loop
+        self.db = await self.timed('database', asyncio.to_thread(Database))
+        self.settings = GuildSettings(self.db)
+        self.scheduler = Scheduler(self.db, shard_scope(self))
+        self.resolver = UserResolver(self)
+        self.log_dispatcher = LogDispatcher(self)
+        self.ticket_index = OpenTicketIndex(self.db, shard_scope(self))
+        self.ticket_pool = TicketChannelPool(self)
+        self.metrics = MetricsServer(self)
+        # Casos e tickets de antes do suporte a vários servidores pertencem ao servidor principal
+        await self.timed('legacy', self.db.adopt_legacy_rows(Config.GUILD_ID))
+        
+        # 2. Caches aquecidos em paralelo com o carregamento das extensões;
+        # o agendador só começa depois que todos os handlers foram registrados
+        extensions = list(EXTENSIONS) + (['sharding'] if Config.SHARDING else [])
+        await asyncio.gather(
+            self.timed('settings', self.settings.load()),
+            self.timed('counters', self.db.get_counters(0)),
+            self.timed('tickets', self.ticket_index.load()),
+            self.timed('metrics', self.metrics.start()),
+            self.timed('extensions', asyncio.gather(*(self.load_extension(ext) for ext in extensions))),
+        )
+        await self.timed('scheduler', self.scheduler.start())
+        
+        self.startup_timings['setup_hook'] = time.perf_counter() - STARTED_AT
+        logger.info("Inicialização: " + ', '.join(
+            f"{phase}={elapsed * 1000:.0f}ms" for phase, elapsed in self.startup_timings.items()
+        ))
+    
+    async def load_lazy(self, name):
+        """Carrega a extensão que contém o comando `name`; retorna se carregou algo"""
+        extension = self._lazy_commands.get(name)
+        if not extension:
+            return False
+        
+        async with self._lazy_lock:
+            if extension not in self.extensions:
+                start = time.perf_counter()
+                await self.load_extension(extension)
+                logger.info(f"Extensão '{extension}' carregada sob demanda em "
+                            f"{(time.perf_counter() - start) * 1000:.0f}ms")
+        return True
+    
+    async def process_commands(self, message):
+        if message.author.bot:
+            return
+        
+        ctx = await self.get_context(message)
+        if ctx.command is None and ctx.invoked_with and await self.load_lazy(ctx.invoked_with):
+            ctx = await self.get_context(message)
+        await self.invoke(ctx)
+    
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            COMMAND_SECONDS.observe(time.perf_counter() - start, ctx.command.qualified_name)
+    
+    async def close(self):
+        await super().close()
+        if hasattr(self, 'db'):
+            self.scheduler.stop()
+            self.ticket_pool.stop()
+            await self.metrics.stop()
+            await self.log_dispatcher.stop()
+            await asyncio.to_thread(self.db.close)
+
+class ModerationBot(ModerationBotMixin, commands.Bot):
+    pass
+
+class ShardedModerationBot(ModerationBotMixin, commands.AutoShardedBot):
+    pass
+
+# Modo com shards: um processo com AutoShardedBot ou vários via launcher.py
+if Config.SHARDING:
+    bot = ShardedModerationBot(
+        command_prefix=PREFIX,
+        intents=intents,
+        help_command=None,
+        http_trace=rest_trace(),
+        shard_count=Config.SHARD_COUNT or None,
+        shard_ids=parse_shard_ids(Config.SHARD_IDS) or None
+    )
+else:
+    bot = ModerationBot(
+        command_prefix=PREFIX,
+        intents=intents,
+        help_command=None,
+        http_trace=rest_trace()
+    )
 
 # Eventos
 @bot.event
 async def on_ready():
+    if 'ready' not in bot.startup_timings:
+        bot.startup_timings['ready'] = time.perf_counter() - STARTED_AT
+        logger.info(f"Pronto em {bot.startup_timings['ready']:.2f}s desde o início do processo")
+    
     print(f'✅ Bot online: {bot.user.name}')
     print(f'🎯 Prefixo: {PREFIX}')
+    if bot.shard_count:
+        print(f'🧩 Shards: {bot.shard_ids or list(range(bot.shard_count))} de {bot.shard_count}')
     await bot.change_presence(activity=discord.Activity(
         type=discord.ActivityType.watching,
         name=f"{PREFIX}ajuda"
     ))
 
-# COMANDOS BÁSICOS (SEMPRE FUNCIONAM)
-@bot.command(name="ping")
-async def ping_cmd(ctx):
-    """Testa o bot"""
-    await ctx.send('🏓 Pong!')
-
-@bot.command(name="ajuda")
-async def ajuda_cmd(ctx):
-    """Mostra ajuda"""
-    embed = discord.Embed(
-        title="📚 Ajuda",
-        description=f"Prefixo: `{PREFIX}`",
-        color=0x5865F2
-    )
-    
-    embed.add_field(
-        name="📋 Comandos Básicos",
-        value=(
-            f"`{PREFIX}ping` - Testa o bot\n"
-            f"`{PREFIX}userinfo` - Suas informações\n"
-            f"`{PREFIX}avatar` - Seu avatar\n"
-            f"`{PREFIX}serverinfo` - Info do servidor\n"
-            f"`{PREFIX}say [texto]` - Repete texto\n"
-            f"`{PREFIX}ajuda` - Esta mensagem"
-        ),
-        inline=False
-    )
-    
-    await ctx.send(embed=embed)
-
-@bot.command(name="userinfo")
-async def userinfo_cmd(ctx, member: discord.Member = None):
-    """Informações do usuário"""
-    member = member or ctx.author
-    
-    embed = discord.Embed(
-        title=f"👤 {member.name}",
-        color=member.color if member.color.value != 0 else 0x5865F2
-    )
-    
-    if member.avatar:
-        embed.set_thumbnail(url=member.avatar.url)
-    
-    embed.add_field(name="ID", value=member.id, inline=True)
-    embed.add_field(name="Conta criada", value=member.created_at.strftime("%d/%m/%Y"), inline=True)
-    
-    if member.joined_at:
-        embed.add_field(name="Entrou aqui", value=member.joined_at.strftime("%d/%m/%Y"), inline=True)
-    
-    embed.add_field(name="Bot", value="✅" if member.bot else "❌", inline=True)
-    
-    await ctx.send(embed=embed)
-
-@bot.command(name="avatar")
-async def avatar_cmd(ctx, member: discord.Member = None):
-    """Mostra avatar"""
-    member = member or ctx.author
-    
-    embed = discord.Embed(
-        title=f"🖼️ Avatar de {member.name}",
-        color=0x5865F2
-    )
-    
-    if member.avatar:
-        embed.set_image(url=member.avatar.url)
-        embed.description = f"[Link]({member.avatar.url})"
-    else:
-        embed.set_image(url=member.default_avatar.url)
-    
-    await ctx.send(embed=embed)
-
-@bot.command(name="serverinfo")
-async def serverinfo_cmd(ctx):
-    """Informações do servidor"""
-    guild = ctx.guild
-    
-    embed = discord.Embed(
-        title=f"🏰 {guild.name}",
-        color=0x9b59b6
-    )
-    
-    if guild.icon:
-        embed.set_thumbnail(url=guild.icon.url)
-    
-    embed.add_field(name="👑 Dono", value=guild.owner.mention, inline=True)
-    embed.add_field(name="👥 Membros", value=guild.member_count, inline=True)
-    embed.add_field(name="📅 Criado em", value=guild.created_at.strftime("%d/%m/%Y"), inline=True)
-    
-    text = len(guild.text_channels)
-    voice = len(guild.voice_channels)
-    embed.add_field(name="📁 Canais", value=f"Texto: {text}\nVoz: {voice}", inline=True)
-    
-    embed.add_field(name="😀 Emojis", value=len(guild.emojis), inline=True)
-    embed.add_field(name="🎭 Cargos", value=len(guild.roles), inline=True)
-    
-    await ctx.send(embed=embed)
-
-@bot.command(name="say")
-async def say_cmd(ctx, *, texto):
-    """Faz o bot falar"""
-    await ctx.send(texto)
-
-# Sistema de moderação SIMPLES
-@bot.command(name="limpar")
-@commands.has_permissions(manage_messages=True)
-async def limpar_cmd(ctx, quantidade: int = 10):
-    """Limpa mensagens (apenas moderadores)"""
-    if quantidade < 1 or quantidade > 100:
-        await ctx.send("❌ Use entre 1 e 100")
-        return
-    
-    deletadas = await ctx.channel.purge(limit=quantidade + 1)
-    msg = await ctx.send(f"🗑️ {len(deletadas)-1} mensagens limpas!")
-    await msg.delete(delay=3)
-
-@bot.command(name="kick")
-@commands.has_permissions(kick_members=True)
-async def kick_cmd(ctx, member: discord.Member, *, motivo="Não especificado"):
-    """Expulsa um usuário"""
-    try:
-        await member.kick(reason=motivo)
-        await ctx.send(f"👢 {member.mention} foi expulso. Motivo: {motivo}")
-    except:
-        await ctx.send("❌ Não tenho permissão")
-
-@bot.command(name="ban")
-@commands.has_permissions(ban_members=True)
-async def ban_cmd(ctx, member: discord.Member, *, motivo="Não especificado"):
-    """Bane um usuário"""
-    try:
-        await member.ban(reason=motivo)
-        await ctx.send(f"🔨 {member.mention} foi banido. Motivo: {motivo}")
-    except:
-        await ctx.send("❌ Não tenho permissão")
-
-# Comandos divertidos
-@bot.command(name="dado")
-async def dado_cmd(ctx, lados: int = 6):
-    """Rola um dado"""
-    if lados < 2:
-        lados = 6
-    
-    resultado = __import__('random').randint(1, lados)
-    await ctx.send(f"🎲 {ctx.author.mention} rolou um D{lados}: **{resultado}**")
-
-@bot.command(name="moeda")
-async def moeda_cmd(ctx):
-    """Cara ou coroa"""
-    resultado = __import__('random').choice(["cara", "coroa"])
-    await ctx.send(f"🪙 {ctx.author.mention} deu: **{resultado}**")
-
-@bot.command(name="sorte")
-async def sorte_cmd(ctx, *, pergunta):
-    """Responde sim/não"""
-    respostas = ["Sim", "Não", "Talvez", "Claro que sim!", "Nunca", "Com certeza"]
-    resposta = __import__('random').choice(respostas)
-    await ctx.send(f"🎱 {ctx.author.mention} perguntou: '{pergunta}'\nResposta: **{resposta}**")
-
 # Tratamento de erros
 @bot.event
 async def on_command_error(ctx, error):
     if isinstance(error, commands.CommandNotFound):
         return
-    elif isinstance(error, commands.MissingPermissions):
+    
+    original = getattr(error, 'original', error)
+    COMMAND_ERRORS.inc(ctx.command.qualified_name if ctx.command else 'desconhecido', type(original).__name__)
+    
+    if isinstance(error, (commands.MissingPermissions, commands.MissingRole, commands.MissingAnyRole,
+                          commands.CheckAnyFailure)):
         await ctx.send("❌ Você não tem permissão")
     else:
+        # Erros de uso (argumento inválido, cooldown...) só vão para o chat
+        if isinstance(error, commands.CommandInvokeError):
+            logger.error(f"Erro no comando {ctx.command}", exc_info=original)
         await ctx.send(f"⚠️ Erro: {str(error)[:100]}")
 
 # INICIAR
 if __name__ == "__main__":
-    if not TOKEN:
+    if not Config.TOKEN:
         print("❌ Token não encontrado! Crie um arquivo .env")
         print("Conteúdo do .env:")
-        print("DISCORD_TOKEN=MTQ2NTgwMTc2MzQwMjU1MTMwNg.GV5NQr.cQZezuj8GEAFTWQQBtOVstxKSelgA8n01ZrcuQ")
+        print("DISCORD_TOKEN=seu_token_aqui")
     else:
         print("🚀 Iniciando bot...")
-        bot.run(TOKEN)
+        bot.run(Config.TOKEN)
@@ -0,0 +1,125 @@
+import discord
+import asyncio
+import logging
+from datetime import datetime, timezone
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class MessageCapture:
+    """Buffer de mensagens de tickets gravado no banco em lotes
+    
+    Inserções, edições e exclusões são acumuladas e gravadas numa única
+    escrita a cada `interval` segundos, ou antes disso se o buffer encher.
+    Um lote que falha volta para a frente do buffer; o que escapar (buffer
+    cheio, bot fora do ar) é recuperado do histórico por `backfill`.
+    """
+    
+    def __init__(self, db, interval=None, max_buffer=None, max_pending=None):
+        self.db = db
+        self.interval = interval or Config.MESSAGE_CAPTURE_INTERVAL
+        self.max_buffer = max_buffer or Config.MESSAGE_CAPTURE_MAX_BUFFER
+        self.max_pending = max_pending or Config.MESSAGE_CAPTURE_MAX_PENDING
+        self._inserts = []
+        self._edits = []
+        self._deletes = []
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+        self.captured = 0
+        self.failed = 0
+        self.dropped = 0
+    
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+    
+    def __len__(self):
+        return len(self._inserts) + len(self._edits) + len(self._deletes)
+    
+    def add(self, ticket_id, message):
+        self._inserts.append((
+            ticket_id, message.id, message.author.id, message.author.name,
+            message.content, message.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        ))
+        self._check_full()
+    
+    def edit(self, message_id, content):
+        self._edits.append((content, self._now(), message_id))
+        self._check_full()
+    
+    def delete(self, message_id):
+        self._deletes.append((self._now(), message_id))
+        self._check_full()
+    
+    async def flush(self):
+        async with self._lock:
+            if not len(self):
+                return
+            
+            inserts, edits, deletes = self._inserts, self._edits, self._deletes
+            self._inserts, self._edits, self._deletes = [], [], []
+            self._full.clear()
+            
+            try:
+                await self.db.save_ticket_messages(inserts, edits, deletes)
+                self.captured += len(inserts)
+            except Exception as e:
+                # Devolver o lote à frente do buffer (a ordem importa: edições depois das inserções)
+                self.failed += 1
+                self._inserts = inserts + self._inserts
+                self._edits = edits + self._edits
+                self._deletes = deletes + self._deletes
+                self._trim()
+                logger.error(f"Falha ao gravar {len(inserts)} mensagens de tickets, nova tentativa em breve: {e}")
+    
+    async def backfill(self, ticket_id, channel, after_id=None):
+        """Captura as mensagens do canal posteriores à última gravada; retorna quantas
+        
+        Cobre mensagens enviadas com o bot fora do ar e inserções descartadas
+        por `_trim`. Inserções repetidas são ignoradas pelo banco.
+        """
+        if after_id is None:
+            after_id = await self.db.get_last_ticket_message_id(ticket_id)
+        
+        after = discord.Object(id=after_id) if after_id else None
+        count = 0
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            self.add(ticket_id, message)
+            count += 1
+        return count
+    
+    @staticmethod
+    def _now():
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    
+    def _trim(self):
+        """Limita o buffer a `max_pending`, descartando primeiro as inserções mais antigas"""
+        excess = len(self) - self.max_pending
+        if excess <= 0:
+            return
+        
+        for entries in (self._inserts, self._edits, self._deletes):
+            removed = min(excess, len(entries))
+            del entries[:removed]
+            excess -= removed
+            self.dropped += removed
+        logger.warning(f"Buffer de captura cheio: {self.dropped} alterações descartadas até agora")
+    
+    def _check_full(self):
+        if len(self) >= self.max_buffer:
+            self._full.set()
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import math
+import time
+from bisect import bisect_left
+from functools import wraps
+import aiohttp
+from aiohttp import web
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + '}'
+
+class Counter:
+    """Contador monotônico, com uma série por combinação de rótulos"""
+    
+    kind = 'counter'
+    
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}  # valores dos rótulos -> total
+    
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+    
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name, self.labels, labels, value
+
+class Histogram:
+    """Histograma de buckets fixos; `observe` é uma busca binária e dois incrementos"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}  # valores dos rótulos -> [contagens por bucket (+Inf no fim), soma]
+    
+    def observe(self, value, *labels):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+    
+    def count(self, *labels):
+        state = self._values.get(labels)
+        return sum(state[0]) if state else 0
+    
+    def samples(self):
+        names = self.labels + ('le',)
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', names, labels + (format_value(bound),), cumulative
+            yield f'{self.name}_sum', self.labels, labels, total
+            yield f'{self.name}_count', self.labels, labels, cumulative
+
+class Gauge:
+    """Valor instantâneo, lido na hora da coleta por `fn() -> {rótulos: valor}`"""
+    
+    kind = 'gauge'
+    
+    def __init__(self, name, help, labels=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.fn = fn
+        self._values = {}
+    
+    def set(self, value, *labels):
+        self._values[labels] = value
+    
+    def samples(self):
+        values = self.fn() if self.fn else self._values
+        for labels, value in values.items():
+            yield self.name, self.labels, labels, value
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+    
+    def register(self, metric):
+        """Registra (ou substitui, pelo nome) uma métrica"""
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+    
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+    
+    def gauge(self, name, help, labels=(), fn=None):
+        return self.register(Gauge(name, help, labels, fn))
+    
+    def render(self):
+        """Texto no formato de exposição do Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            try:
+                for name, label_names, labels, value in metric.samples():
+                    lines.append(f'{name}{format_labels(label_names, labels)} {format_value(value)}')
+            except Exception as e:
+                logger.error(f"Erro ao coletar a métrica {metric.name}: {e}")
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+COMMAND_SECONDS = registry.histogram(
+    'bot_command_duration_seconds', 'Duração dos comandos de prefixo', ('command',))
+COMMAND_ERRORS = registry.counter(
+    'bot_command_errors_total', 'Erros em comandos de prefixo', ('command', 'error'))
+INTERACTION_SECONDS = registry.histogram(
+    'bot_interaction_duration_seconds', 'Duração de botões e modais', ('interaction',))
+INTERACTION_ERRORS = registry.counter(
+    'bot_interaction_errors_total', 'Erros em botões e modais', ('interaction', 'error'))
+DB_QUERY_SECONDS = registry.histogram(
+    'bot_db_query_duration_seconds', 'Duração das operações no banco (fila incluída)', ('statement', 'kind'))
+DB_ERRORS = registry.counter(
+    'bot_db_errors_total', 'Operações no banco que falharam', ('statement', 'kind'))
+REST_REQUESTS = registry.counter(
+    'discord_rest_requests_total', 'Requisições HTTP à API do Discord', ('method', 'status'))
+REST_RATELIMITED = registry.counter(
+    'discord_rest_ratelimited_total', 'Respostas 429 da API do Discord', ('scope',))
+LOOP_LAG = registry.histogram(
+    'bot_event_loop_lag_seconds', 'Atraso do event loop em relação ao agendado', buckets=LAG_BUCKETS)
+
+def track_interaction(name):
+    """Mede a duração e conta os erros de um callback de botão ou modal"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                INTERACTION_ERRORS.inc(name, type(e).__name__)
+                raise
+            finally:
+                INTERACTION_SECONDS.observe(time.perf_counter() - start, name)
+        return wrapper
+    return decorator
+
+def rest_trace():
+    """TraceConfig do aiohttp que conta as requisições REST feitas pelo discord.py"""
+    async def on_request_end(session, context, params):
+        status = params.response.status
+        REST_REQUESTS.inc(params.method, str(status))
+        if status == 429:
+            REST_RATELIMITED.inc(params.response.headers.get('X-RateLimit-Scope', 'unknown'))
+    
+    async def on_request_exception(session, context, params):
+        REST_REQUESTS.inc(params.method, 'error')
+    
+    trace = aiohttp.TraceConfig()
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+class MetricsServer:
+    """Endpoint HTTP local `/metrics` e medição do atraso do event loop
+    
+    Cada processo do launcher usa METRICS_PORT + ID_WORKER_ID; porta 0
+    desativa o endpoint, mas as métricas continuam sendo registradas.
+    """
+    
+    def __init__(self, bot, host=None, port=None):
+        self.bot = bot
+        self.host = host or Config.METRICS_HOST
+        if port is None:
+            port = Config.METRICS_PORT and Config.METRICS_PORT + Config.ID_WORKER_ID
+        self.port = port
+        self._runner = None
+        self._lag_task = None
+        self._lag = 0.0
+        self._register_gauges()
+    
+    def _register_gauges(self):
+        bot = self.bot
+        registry.gauge('bot_event_loop_lag_last_seconds', 'Último atraso medido do event loop',
+                       fn=lambda: {(): self._lag})
+        registry.gauge('discord_gateway_latency_seconds', 'Latência do heartbeat do gateway', ('shard',),
+                       fn=lambda: {(str(shard_id),): latency
+                                   for shard_id, latency in (getattr(bot, 'latencies', None) or [(0, bot.latency)])
+                                   if math.isfinite(latency)})
+        registry.gauge('bot_guilds', 'Servidores atendidos por este processo', fn=lambda: {(): len(bot.guilds)})
+        
+        # Serviços existentes expõem suas próprias estatísticas
+        services = {
+            'log_dispatcher': 'bot_log_dispatcher',
+            'resolver': 'bot_user_cache',
+            'ticket_pool': 'bot_ticket_pool',
+        }
+        for attribute, prefix in services.items():
+            registry.gauge(f'{prefix}_stats', f'Estatísticas de bot.{attribute}', ('stat',),
+                           fn=lambda attribute=attribute: {
+                               (stat,): value for stat, value in getattr(bot, attribute).stats().items()
+                           } if hasattr(bot, attribute) else {})
+        registry.gauge('bot_scheduled_tasks', 'Tarefas agendadas pendentes',
+                       fn=lambda: {(): len(bot.scheduler)} if hasattr(bot, 'scheduler') else {})
+        registry.gauge('bot_open_tickets', 'Tickets abertos no índice em memória',
+                       fn=lambda: {(): len(bot.ticket_index)} if hasattr(bot, 'ticket_index') else {})
+    
+    async def start(self):
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._watch_loop())
+        if self._runner or not self.port:
+            return
+        
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            logger.error(f"Não foi possível abrir o endpoint de métricas em {self.host}:{self.port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        logger.info(f"Métricas em http://{self.host}:{self.port}/metrics")
+    
+    async def stop(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    async def handle(self, request):
+        return web.Response(text=registry.render(),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+    
+    async def _watch_loop(self):
+        loop = asyncio.get_running_loop()
+        interval = Config.METRICS_LAG_INTERVAL
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self._lag = max(0.0, loop.time() - start - interval)
+            LOOP_LAG.observe(self._lag)
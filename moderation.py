@@ -2,21 +2,117 @@ import discord
 from discord.ext import commands
 from datetime import datetime, timedelta
 import asyncio
-import random
-import string
+import re
+import time
 from config import Config
+from sharding import shard_scope
+from mute_roles import MuteRoleProvisioner
+from action_pipeline import ActionPipeline
+from ids import new_id
+from guild_settings import setup_settings, guild_role
+
+TIME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def parse_duration(duration):
+    """Converte durações como '30m' ou '2h' em segundos (None se inválida)"""
+    unit = duration[-1:].lower()
+    amount = duration[:-1]
+    if unit not in TIME_UNITS or not amount.isdigit():
+        return None
+    return int(amount) * TIME_UNITS[unit]
+
+MASS_FILTER = re.compile(r'^(joined|created):(\d+[smhd])$', re.IGNORECASE)
+MASS_TARGET = re.compile(r'^(?:<@!?)?(\d{15,20})>?$')
+
+def parse_mass_targets(text):
+    """Separa IDs/menções e filtros (joined:, created:) do motivo
+    
+    Os alvos vêm primeiro; o primeiro token que não é alvo nem filtro
+    inicia o motivo. Os filtros são convertidos em timedelta.
+    """
+    ids = []
+    filters = {}
+    tokens = (text or '').split()
+    consumed = 0
+    for token in tokens:
+        target = MASS_TARGET.match(token)
+        filter_match = MASS_FILTER.match(token)
+        if target:
+            ids.append(int(target.group(1)))
+        elif filter_match:
+            filters[filter_match.group(1).lower()] = timedelta(seconds=parse_duration(filter_match.group(2)))
+        else:
+            break
+        consumed += 1
+    
+    reason = ' '.join(tokens[consumed:]) or "Não especificado"
+    return list(dict.fromkeys(ids)), filters, reason
+
+def format_id_list(ids, limit=1000):
+    """Lista de menções que cabe num campo de embed"""
+    text = ''
+    for i, user_id in enumerate(ids):
+        entry = f"<@{user_id}> "
+        if len(text) + len(entry) > limit:
+            return text + f"... e mais {len(ids) - i}"
+        text += entry
+    return text or "Nenhum"
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.provisioner = MuteRoleProvisioner(bot.db)
+        self._resumed = False
     
-    async def log_mod_action(self, action, user, moderator, reason, duration=None):
-        """Log de ações de moderação"""
-        log_channel = self.bot.get_channel(Config.MOD_LOG_CHANNEL)
+    async def cog_load(self):
+        await setup_settings(self.bot)
+        
+        # Agendador compartilhado criado no setup_hook, iniciado após o registro dos handlers
+        self.bot.scheduler.register('unmute', self.expire_mute)
+    
+    def cog_unload(self):
+        self.bot.scheduler.unregister('unmute')
+        self.provisioner.cancel_all()
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Retomar só os provisionamentos interrompidos, e só no primeiro ready (não em reconexões)
+        if not self._resumed:
+            self._resumed = True
+            await self.provisioner.resume(self.bot, shard_scope(self.bot))
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        mute_role = discord.utils.get(channel.guild.roles, name="Muted")
+        if mute_role and not self.provisioner.is_configured(channel, mute_role):
+            await self.provisioner.apply(channel, mute_role)
+    
+    async def expire_mute(self, guild_id, user_id, channel_id):
+        """Remove um mute expirado (chamado pelo agendador)"""
+        await self.bot.wait_until_ready()
+        
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
         
-        if not log_channel:
+        member = guild.get_member(user_id)
+        mute_role = discord.utils.get(guild.roles, name="Muted")
+        if not member or not mute_role or mute_role not in member.roles:
             return
         
+        await member.remove_roles(mute_role, reason="Mute expirado")
+        
+        # Embed de unmute automático
+        channel = guild.get_channel(channel_id) if channel_id else None
+        if channel:
+            auto_embed = discord.Embed(
+                description=f"🔊 {member.mention} foi automaticamente desilenciado.",
+                color=Config.COLORS['info']
+            )
+            await channel.send(embed=auto_embed)
+    
+    def log_mod_action(self, action, user, moderator, reason, duration=None):
+        """Log de ações de moderação (enfileirado, enviado em lote)"""
         embed = discord.Embed(
             title=f"🛡️ {action.upper()}",
             color=Config.COLORS['warning'],
@@ -29,117 +125,141 @@ class Moderation(commands.Cog):
         if duration:
             embed.add_field(name="Duração", value=duration, inline=True)
         
-        await log_channel.send(embed=embed)
+        self.bot.log_dispatcher.send(self.bot.settings.get(moderator.guild.id, 'mod_log_channel'), embed)
     
-    @commands.command(name="warn")
-    @commands.has_role(Config.MOD_ROLE)
-    async def warn(self, ctx, member: discord.Member, *, reason="Não especificado"):
-        """Adverte um usuário"""
-        case_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        
-        # Salvar no banco
-        await self.bot.db.add_mod_action(
-            case_id, member.id, ctx.author.id, "warn", reason
+    async def send_user_notice(self, member, embed):
+        """Envia a notificação da punição por DM (falhas ficam no pipeline)"""
+        await member.send(embed=embed)
+    
+    def notice_embed(self, title, guild, moderator, reason, case_id, color, duration=None):
+        embed = discord.Embed(
+            title=title,
+            description=f"Servidor: {guild.name}",
+            color=color
         )
-        
-        # Embed para o usuário
-        user_embed = discord.Embed(
-            title="⚠️ Você foi advertido",
-            description=f"Servidor: {ctx.guild.name}",
-            color=Config.COLORS['warning']
+        embed.add_field(name="Motivo", value=reason)
+        if duration:
+            embed.add_field(name="Duração", value=duration)
+        embed.add_field(name="Moderador", value=moderator.name)
+        embed.set_footer(text=f"Case ID: {case_id}")
+        return embed
+    
+    async def warn_member(self, guild, member, moderator, reason, reply=None):
+        """Adverte um membro e registra o caso; retorna o case ID
+        
+        `reply` é uma função opcional que envia a resposta no canal; ela e
+        a DM só saem depois que o caso foi gravado (o case ID precisa existir).
+        """
+        case_id = new_id()
+        notice = self.notice_embed(
+            "⚠️ Você foi advertido", guild, moderator, reason, case_id, Config.COLORS['warning']
         )
-        user_embed.add_field(name="Motivo", value=reason)
-        user_embed.add_field(name="Moderador", value=ctx.author.name)
-        user_embed.set_footer(text=f"Case ID: {case_id}")
         
-        try:
-            await member.send(embed=user_embed)
-        except:
-            pass
+        pipeline = ActionPipeline(f"warn {case_id}")
+        pipeline.add('db', lambda: self.bot.db.add_mod_action(
+            case_id, member.id, moderator.id, "warn", reason, guild_id=guild.id
+        ), required=True)
+        pipeline.add('dm', lambda: self.send_user_notice(member, notice), requires=['db'])
+        if reply:
+            pipeline.add('reply', reply, requires=['db'])
+        await pipeline.run()
+        
+        self.log_mod_action("WARN", member, moderator, reason)
+        return case_id
+    
+    async def mute_member(self, guild, member, moderator, seconds, duration, reason, channel=None, reply=None):
+        """Silencia um membro por `seconds` segundos; retorna o case ID"""
+        mute_role = discord.utils.get(guild.roles, name="Muted")
+        if not mute_role:
+            # Criar role de mute se não existir
+            mute_role = await guild.create_role(name="Muted", color=discord.Color.dark_gray())
+            
+            # Configurar permissões nos canais em segundo plano; o mute vale já
+            self.provisioner.provision(guild, mute_role)
         
-        # Embed no canal
+        case_id = new_id()
+        notice = self.notice_embed(
+            "🔇 Você foi silenciado", guild, moderator, reason, case_id, Config.COLORS['warning'],
+            duration=duration
+        )
+        
+        # Depois do cargo aplicado, agendamento e registro rodam em paralelo; DM e resposta esperam o registro
+        pipeline = ActionPipeline(f"mute {case_id}")
+        pipeline.add('role', lambda: member.add_roles(mute_role), required=True)
+        # Agendar remoção automática (persistida, sobrevive a reinícios)
+        pipeline.add('schedule', lambda: self.bot.scheduler.schedule(
+            'unmute', guild.id, member.id, seconds, channel_id=channel.id if channel else None
+        ), requires=['role'], required=True)
+        pipeline.add('db', lambda: self.bot.db.add_mod_action(
+            case_id, member.id, moderator.id, "mute", reason, duration, guild_id=guild.id
+        ), requires=['role'], required=True)
+        pipeline.add('dm', lambda: self.send_user_notice(member, notice), requires=['role', 'db'])
+        if reply:
+            pipeline.add('reply', reply, requires=['role', 'db'])
+        await pipeline.run()
+        
+        self.log_mod_action("MUTE", member, moderator, reason, duration)
+        return case_id
+    
+    async def remove_member(self, action, guild, member, moderator, reason, reply=None):
+        """Expulsa ou bane um membro; a DM sai antes, enquanto ainda há servidor em comum"""
+        case_id = new_id()
+        title = "👢 Você foi expulso" if action == "kick" else "🔨 Você foi banido"
+        notice = self.notice_embed(title, guild, moderator, reason, case_id, Config.COLORS['error'])
+        remove = member.kick if action == "kick" else member.ban
+        
+        pipeline = ActionPipeline(f"{action} {case_id}")
+        pipeline.add('dm', lambda: self.send_user_notice(member, notice))
+        pipeline.add(action, lambda: remove(reason=f"{moderator}: {reason}"), after=['dm'], required=True)
+        pipeline.add('db', lambda: self.bot.db.add_mod_action(
+            case_id, member.id, moderator.id, action, reason, guild_id=guild.id
+        ), requires=[action], required=True)
+        if reply:
+            pipeline.add('reply', reply, requires=[action])
+        await pipeline.run()
+        
+        self.log_mod_action(action.upper(), member, moderator, reason)
+        return case_id
+    
+    async def kick_member(self, guild, member, moderator, reason, reply=None):
+        """Expulsa um membro (avisando por DM antes); retorna o case ID"""
+        return await self.remove_member("kick", guild, member, moderator, reason, reply)
+    
+    async def ban_member(self, guild, member, moderator, reason, reply=None):
+        """Bane um membro (avisando por DM antes); retorna o case ID"""
+        return await self.remove_member("ban", guild, member, moderator, reason, reply)
+    
+    @commands.command(name="warn")
+    @guild_role('mod_role')
+    async def warn(self, ctx, member: discord.Member, *, reason="Não especificado"):
+        """Adverte um usuário"""
+        # Embed no canal, enviado junto com os demais efeitos da ação
         embed = discord.Embed(
             description=f"✅ {member.mention} foi advertido.",
             color=Config.COLORS['success']
         )
-        await ctx.send(embed=embed)
-        
-        # Log
-        await self.log_mod_action("WARN", member, ctx.author, reason)
+        await self.warn_member(ctx.guild, member, ctx.author, reason,
+                               reply=lambda: ctx.send(embed=embed))
     
     @commands.command(name="mute")
-    @commands.has_role(Config.MOD_ROLE)
+    @guild_role('mod_role')
     async def mute(self, ctx, member: discord.Member, duration: str = "1h", *, reason="Não especificado"):
         """Silencia um usuário por um tempo determinado"""
-        # Converter duração para segundos
-        time_units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
-        unit = duration[-1].lower()
-        amount = int(duration[:-1])
-        
-        if unit not in time_units:
-            await ctx.send("❌ Unidade de tempo inválida. Use s, m, h ou d.")
+        seconds = parse_duration(duration)
+        if seconds is None:
+            await ctx.send("❌ Duração inválida. Use um número seguido de s, m, h ou d.")
             return
         
-        seconds = amount * time_units[unit]
-        
-        # Aplicar mute
-        mute_role = discord.utils.get(ctx.guild.roles, name="Muted")
-        if not mute_role:
-            # Criar role de mute se não existir
-            mute_role = await ctx.guild.create_role(name="Muted", color=discord.Color.dark_gray())
-            
-            # Configurar permissões em todos os canais
-            for channel in ctx.guild.channels:
-                await channel.set_permissions(mute_role, send_messages=False, add_reactions=False)
-        
-        await member.add_roles(mute_role)
-        
-        # Salvar no banco
-        case_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        await self.bot.db.add_mod_action(
-            case_id, member.id, ctx.author.id, "mute", reason, duration
-        )
-        
-        # Embed para o usuário
-        user_embed = discord.Embed(
-            title="🔇 Você foi silenciado",
-            description=f"Servidor: {ctx.guild.name}",
-            color=Config.COLORS['warning']
-        )
-        user_embed.add_field(name="Motivo", value=reason)
-        user_embed.add_field(name="Duração", value=duration)
-        user_embed.add_field(name="Moderador", value=ctx.author.name)
-        user_embed.set_footer(text=f"Case ID: {case_id}")
-        
-        try:
-            await member.send(embed=user_embed)
-        except:
-            pass
-        
-        # Embed no canal
+        # Embed no canal, enviado junto com os demais efeitos da ação
         embed = discord.Embed(
             description=f"🔇 {member.mention} foi silenciado por {duration}.",
             color=Config.COLORS['success']
         )
-        await ctx.send(embed=embed)
-        
-        # Log
-        await self.log_mod_action("MUTE", member, ctx.author, reason, duration)
-        
-        # Auto-remover mute
-        await asyncio.sleep(seconds)
-        if mute_role in member.roles:
-            await member.remove_roles(mute_role)
-            
-            # Embed de unmute automático
-            auto_embed = discord.Embed(
-                description=f"🔊 {member.mention} foi automaticamente desilenciado.",
-                color=Config.COLORS['info']
-            )
-            await ctx.send(embed=auto_embed)
+        await self.mute_member(ctx.guild, member, ctx.author, seconds, duration, reason, ctx.channel,
+                               reply=lambda: ctx.send(embed=embed))
     
     @commands.command(name="unmute")
-    @commands.has_role(Config.MOD_ROLE)
+    @guild_role('mod_role')
     async def unmute(self, ctx, member: discord.Member):
         """Remove o silenciamento de um usuário"""
         mute_role = discord.utils.get(ctx.guild.roles, name="Muted")
@@ -149,6 +269,7 @@ class Moderation(commands.Cog):
             return
         
         await member.remove_roles(mute_role)
+        await self.bot.scheduler.cancel('unmute', ctx.guild.id, member.id)
         
         embed = discord.Embed(
             description=f"🔊 {member.mention} foi desilenciado.",
@@ -156,84 +277,181 @@ class Moderation(commands.Cog):
         )
         await ctx.send(embed=embed)
         
-        await self.log_mod_action("UNMUTE", member, ctx.author, "Remoção manual")
+        self.log_mod_action("UNMUTE", member, ctx.author, "Remoção manual")
     
     @commands.command(name="kick")
-    @commands.has_role(Config.MOD_ROLE)
+    @guild_role('mod_role')
     async def kick(self, ctx, member: discord.Member, *, reason="Não especificado"):
         """Expulsa um usuário do servidor"""
-        case_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        
-        # Embed para o usuário
-        user_embed = discord.Embed(
-            title="👢 Você foi expulso",
-            description=f"Servidor: {ctx.guild.name}",
-            color=Config.COLORS['error']
-        )
-        user_embed.add_field(name="Motivo", value=reason)
-        user_embed.add_field(name="Moderador", value=ctx.author.name)
-        user_embed.set_footer(text=f"Case ID: {case_id}")
-        
-        try:
-            await member.send(embed=user_embed)
-        except:
-            pass
-        
-        await member.kick(reason=f"{ctx.author}: {reason}")
-        
-        # Salvar no banco
-        await self.bot.db.add_mod_action(
-            case_id, member.id, ctx.author.id, "kick", reason
-        )
-        
         embed = discord.Embed(
             description=f"👢 {member.mention} foi expulso.",
             color=Config.COLORS['success']
         )
-        await ctx.send(embed=embed)
-        
-        await self.log_mod_action("KICK", member, ctx.author, reason)
+        await self.kick_member(ctx.guild, member, ctx.author, reason,
+                               reply=lambda: ctx.send(embed=embed))
     
     @commands.command(name="ban")
-    @commands.has_role(Config.MOD_ROLE)
+    @guild_role('mod_role')
     async def ban(self, ctx, member: discord.Member, *, reason="Não especificado"):
         """Bane um usuário do servidor"""
-        case_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        
-        # Embed para o usuário
-        user_embed = discord.Embed(
-            title="🔨 Você foi banido",
-            description=f"Servidor: {ctx.guild.name}",
-            color=Config.COLORS['error']
-        )
-        user_embed.add_field(name="Motivo", value=reason)
-        user_embed.add_field(name="Moderador", value=ctx.author.name)
-        user_embed.set_footer(text=f"Case ID: {case_id}")
-        
-        try:
-            await member.send(embed=user_embed)
-        except:
-            pass
-        
-        await member.ban(reason=f"{ctx.author}: {reason}")
-        
-        # Salvar no banco
-        await self.bot.db.add_mod_action(
-            case_id, member.id, ctx.author.id, "ban", reason
-        )
-        
         embed = discord.Embed(
             description=f"🔨 {member.mention} foi banido.",
             color=Config.COLORS['success']
         )
-        await ctx.send(embed=embed)
+        await self.ban_member(ctx.guild, member, ctx.author, reason,
+                              reply=lambda: ctx.send(embed=embed))
+    
+    def select_mass_targets(self, ctx, ids, filters, members_only):
+        """Monta a lista de alvos, descartando quem não pode ser punido"""
+        guild = ctx.guild
+        now = discord.utils.utcnow()
+        targets = {}
+        
+        for user_id in ids:
+            member = guild.get_member(user_id)
+            if member or not members_only:
+                targets[user_id] = member or discord.Object(id=user_id)
+        
+        if filters:
+            for member in guild.members:
+                if 'joined' in filters and (not member.joined_at or now - member.joined_at > filters['joined']):
+                    continue
+                if 'created' in filters and now - member.created_at > filters['created']:
+                    continue
+                targets[member.id] = member
+        
+        # Nunca punir o autor, o dono, o bot ou cargos iguais/superiores
+        allowed = []
+        for target in targets.values():
+            if target.id in (ctx.author.id, guild.owner_id, guild.me.id):
+                continue
+            if isinstance(target, discord.Member):
+                if target.top_role >= guild.me.top_role:
+                    continue
+                if ctx.author.id != guild.owner_id and target.top_role >= ctx.author.top_role:
+                    continue
+            allowed.append(target)
+        return allowed, len(targets) - len(allowed)
+    
+    def mass_progress_embed(self, action, total, done, failed, elapsed, finished=False):
+        embed = discord.Embed(
+            title=f"{'✅' if finished else '⏳'} MASS{action.upper()}",
+            description=f"Processados **{done}/{total}** usuários "
+                        f"({done - failed} com sucesso, {failed} falhas) em {elapsed:.1f}s.",
+            color=Config.COLORS['success' if finished else 'info']
+        )
+        return embed
+    
+    def log_mass_action(self, action, moderator, reason, succeeded, failed, elapsed):
+        """Um único embed de log para toda a ação em massa"""
+        embed = discord.Embed(
+            title=f"🛡️ MASS{action.upper()}",
+            color=Config.COLORS['error'],
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="Moderador", value=moderator.mention, inline=True)
+        embed.add_field(name="Resultado", value=f"{len(succeeded)} sucesso(s), {len(failed)} falha(s)", inline=True)
+        embed.add_field(name="Tempo", value=f"{elapsed:.1f}s", inline=True)
+        embed.add_field(name="Motivo", value=reason, inline=False)
+        embed.add_field(name="Usuários", value=format_id_list(succeeded), inline=False)
+        if failed:
+            embed.add_field(name="Falhas", value=format_id_list(failed), inline=False)
+        
+        self.bot.log_dispatcher.send(self.bot.settings.get(moderator.guild.id, 'mod_log_channel'), embed)
+    
+    async def mass_action(self, ctx, action, text):
+        """Executa ban/kick em massa com um número limitado de workers
+        
+        Sem DMs (alvos de raid raramente as leem) e com um único embed de
+        log; os casos são gravados numa única transação ao final.
+        """
+        ids, filters, reason = parse_mass_targets(text)
+        if not ids and not filters:
+            await ctx.send(f"❌ Informe IDs, menções ou filtros. Ex.: `{ctx.clean_prefix}mass{action} joined:10m created:1d raid`")
+            return
         
-        await self.log_mod_action("BAN", member, ctx.author, reason)
+        targets, skipped = self.select_mass_targets(ctx, ids, filters, members_only=action == 'kick')
+        if not targets:
+            await ctx.send("❌ Nenhum usuário elegível encontrado.")
+            return
+        if len(targets) > Config.MASS_ACTION_MAX_TARGETS:
+            await ctx.send(f"❌ {len(targets)} alvos excedem o limite de {Config.MASS_ACTION_MAX_TARGETS}.")
+            return
+        
+        total = len(targets)
+        succeeded = []
+        failed = []
+        start = time.monotonic()
+        status = await ctx.send(embed=self.mass_progress_embed(action, total, 0, 0, 0))
+        
+        queue = asyncio.Queue()
+        for target in targets:
+            queue.put_nowait(target)
+        audit_reason = f"{ctx.author}: {reason}"
+        
+        async def worker():
+            while not queue.empty():
+                target = queue.get_nowait()
+                try:
+                    if action == 'ban':
+                        await ctx.guild.ban(target, reason=audit_reason)
+                    else:
+                        await target.kick(reason=audit_reason)
+                    succeeded.append(target.id)
+                except discord.HTTPException:
+                    failed.append(target.id)
+        
+        async def report():
+            while True:
+                await asyncio.sleep(Config.MASS_ACTION_PROGRESS_INTERVAL)
+                try:
+                    await status.edit(embed=self.mass_progress_embed(
+                        action, total, len(succeeded) + len(failed), len(failed), time.monotonic() - start
+                    ))
+                except discord.HTTPException:
+                    pass
+        
+        reporter = asyncio.create_task(report())
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(Config.MASS_ACTION_CONCURRENCY, total))))
+        finally:
+            reporter.cancel()
+        elapsed = time.monotonic() - start
+        
+        await self.bot.db.add_mod_actions([
+            (new_id(), user_id, ctx.author.id, action, reason, None, ctx.guild.id)
+            for user_id in succeeded
+        ])
+        
+        embed = self.mass_progress_embed(action, total, total, len(failed), elapsed, finished=True)
+        if skipped:
+            embed.set_footer(text=f"{skipped} usuário(s) ignorado(s) por hierarquia ou permissão")
+        await status.edit(embed=embed)
+        
+        self.log_mass_action(action, ctx.author, reason, succeeded, failed, elapsed)
     
-    @commands.command(name="clear")
-    @commands.has_role(Config.MOD_ROLE)
+    @commands.command(name="massban")
+    @guild_role('mod_role')
+    @commands.max_concurrency(1, commands.BucketType.guild)
+    async def massban(self, ctx, *, targets: str = ""):
+        """Bane vários usuários (IDs, menções ou filtros joined:/created:)"""
+        await self.mass_action(ctx, 'ban', targets)
+    
+    @commands.command(name="masskick")
+    @guild_role('mod_role')
+    @commands.max_concurrency(1, commands.BucketType.guild)
+    async def masskick(self, ctx, *, targets: str = ""):
+        """Expulsa vários membros (IDs, menções ou filtros joined:/created:)"""
+        await self.mass_action(ctx, 'kick', targets)
+    
+    @commands.command(name="clear", aliases=["limpar"])
+    # Moderadores, ou quem já podia usar o antigo !limpar (gerenciar mensagens)
+    @commands.check_any(guild_role('mod_role'), commands.has_permissions(manage_messages=True))
     async def clear(self, ctx, amount: int = 10):
         """Limpa mensagens do canal"""
+        if amount < 1:
+            await ctx.send("❌ Informe pelo menos 1 mensagem.")
+            return
         if amount > 100:
             await ctx.send("❌ Você só pode limpar até 100 mensagens de uma vez.")
             return
@@ -249,10 +467,10 @@ class Moderation(commands.Cog):
         await msg.delete()
     
     @commands.command(name="warnings")
-    @commands.has_role(Config.MOD_ROLE)
+    @guild_role('mod_role')
     async def warnings(self, ctx, member: discord.Member):
         """Mostra as advertências de um usuário"""
-        warnings = await self.bot.db.get_user_warnings(member.id)
+        warnings = await self.bot.db.get_user_warnings(ctx.guild.id, member.id)
         
         if not warnings:
             embed = discord.Embed(
@@ -267,8 +485,12 @@ class Moderation(commands.Cog):
             color=Config.COLORS['warning']
         )
         
+        moderators = await self.bot.resolver.resolve_many(
+            [warn['moderator_id'] for warn in warnings], ctx.guild
+        )
+        
         for i, warn in enumerate(warnings, 1):
-            moderator = await self.bot.fetch_user(warn['moderator_id'])
+            moderator = moderators.get(warn['moderator_id'])
             embed.add_field(
                 name=f"⚠️ Case {warn['case_id']}",
                 value=f"**Motivo:** {warn['reason']}\n"
@@ -280,26 +502,28 @@ class Moderation(commands.Cog):
         await ctx.send(embed=embed)
     
     @commands.command(name="case")
-    @commands.has_role(Config.MOD_ROLE)
+    @guild_role('mod_role')
     async def case_info(self, ctx, case_id: str):
         """Mostra informações de um caso específico"""
-        with self.bot.db.get_connection() as conn:
-            cursor = conn.execute('SELECT * FROM moderation WHERE case_id = ?', (case_id,))
-            case = cursor.fetchone()
+        case_id = case_id.upper()
+        case = await self.bot.db.get_case(ctx.guild.id, case_id)
         
         if not case:
             await ctx.send("❌ Caso não encontrado.")
             return
         
-        user = await self.bot.fetch_user(case['user_id'])
-        moderator = await self.bot.fetch_user(case['moderator_id'])
+        users = await self.bot.resolver.resolve_many(
+            [case['user_id'], case['moderator_id']], ctx.guild
+        )
+        user = users.get(case['user_id'])
+        moderator = users.get(case['moderator_id'])
         
         embed = discord.Embed(
             title=f"🛡️ Caso {case_id}",
             color=Config.COLORS['info']
         )
-        embed.add_field(name="Usuário", value=f"{user.mention}\n({user.id})")
-        embed.add_field(name="Moderador", value=moderator.mention)
+        embed.add_field(name="Usuário", value=f"{user.mention if user else 'Desconhecido'}\n({case['user_id']})")
+        embed.add_field(name="Moderador", value=moderator.mention if moderator else 'Desconhecido')
         embed.add_field(name="Ação", value=case['action'].upper())
         embed.add_field(name="Motivo", value=case['reason'] or "Não especificado")
         embed.add_field(name="Duração", value=case['duration'] or "N/A")
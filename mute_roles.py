@@ -0,0 +1,86 @@
+import discord
+import asyncio
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class MuteRoleProvisioner:
+    """Aplica as permissões do cargo Muted nos canais em segundo plano
+    
+    Os canais são percorridos em ordem de ID, em lotes paralelos limitados
+    por um semáforo; o cliente HTTP do discord.py respeita os buckets de
+    rate limit de cada rota. Depois de cada lote o último canal processado
+    é gravado em `mute_provisioning`, então um provisionamento interrompido
+    é retomado de onde parou, e um servidor concluído não é varrido de novo
+    (overwrites alterados pelos admins são preservados).
+    """
+    
+    def __init__(self, db, concurrency=None):
+        self.db = db
+        self.concurrency = concurrency or Config.MUTE_PROVISION_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._jobs = {}  # guild_id -> asyncio.Task
+    
+    @staticmethod
+    def is_configured(channel, role):
+        overwrite = channel.overwrites_for(role)
+        return overwrite.send_messages is False and overwrite.add_reactions is False
+    
+    def provision(self, guild, role, cursor=0):
+        """Inicia (ou reaproveita) o provisionamento do cargo a partir do canal `cursor`"""
+        job = self._jobs.get(guild.id)
+        if job and not job.done():
+            return job
+        
+        job = asyncio.create_task(self._provision(guild, role, cursor))
+        self._jobs[guild.id] = job
+        job.add_done_callback(lambda _: self._jobs.pop(guild.id, None))
+        return job
+    
+    async def resume(self, bot, scope=None):
+        """Retoma os provisionamentos não concluídos (uma vez, no início)"""
+        for row in await self.db.get_pending_mute_provisioning(scope):
+            guild = bot.get_guild(row['guild_id'])
+            if not guild:
+                continue
+            role = guild.get_role(row['role_id'])
+            if not role:
+                # Cargo apagado: não há o que terminar
+                await self.db.save_mute_provisioning(guild.id, row['role_id'], row['cursor'], done=True)
+                continue
+            self.provision(guild, role, row['cursor'])
+    
+    def cancel_all(self):
+        for job in self._jobs.values():
+            job.cancel()
+    
+    async def apply(self, channel, role):
+        """Aplica a permissão de mute em um único canal"""
+        async with self._semaphore:
+            try:
+                await channel.set_permissions(role, send_messages=False, add_reactions=False,
+                                              reason="Configuração do cargo Muted")
+                return True
+            except discord.HTTPException as e:
+                logger.warning(f"Falha ao configurar o cargo Muted em #{channel} ({channel.id}): {e}")
+                return False
+    
+    async def _provision(self, guild, role, cursor):
+        await self.db.save_mute_provisioning(guild.id, role.id, cursor)
+        pending = sorted((channel for channel in guild.channels
+                          if channel.id > cursor and not self.is_configured(channel, role)),
+                         key=lambda channel: channel.id)
+        
+        if pending:
+            logger.info(f"Configurando o cargo Muted em {len(pending)} canais de {guild.name} ({guild.id})")
+        applied = 0
+        for i in range(0, len(pending), self.concurrency):
+            batch = pending[i:i + self.concurrency]
+            results = await asyncio.gather(*(self.apply(channel, role) for channel in batch))
+            applied += sum(results)
+            await self.db.save_mute_provisioning(guild.id, role.id, batch[-1].id)
+        
+        await self.db.save_mute_provisioning(guild.id, role.id, pending[-1].id if pending else cursor, done=True)
+        if pending:
+            logger.info(f"Cargo Muted configurado em {applied}/{len(pending)} canais de {guild.name}")
@@ -0,0 +1,69 @@
+import discord
+import asyncio
+import time
+from collections import OrderedDict
+from config import Config
+
+class UserResolver:
+    """Resolve IDs de usuários evitando chamadas REST desnecessárias
+    
+    Ordem de busca: membros do servidor e cache do gateway, depois um cache
+    LRU com TTL dos usuários já buscados. Buscas simultâneas pelo mesmo ID
+    compartilham a mesma requisição.
+    """
+    
+    def __init__(self, bot, max_size=None, ttl=None):
+        self.bot = bot
+        self.max_size = max_size or Config.USER_CACHE_SIZE
+        self.ttl = ttl or Config.USER_CACHE_TTL
+        self._cache = OrderedDict()  # user_id -> (expires_at, user)
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+    
+    async def resolve(self, user_id, guild=None):
+        """Retorna o usuário (ou membro) com este ID, ou None se não existir"""
+        if user_id is None:
+            return None
+        
+        user = (guild.get_member(user_id) if guild else None) or self.bot.get_user(user_id)
+        if user:
+            self.hits += 1
+            return user
+        
+        entry = self._cache.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+        
+        self.misses += 1
+        future = self._inflight.get(user_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(user_id))
+            self._inflight[user_id] = future
+            future.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        return await asyncio.shield(future)
+    
+    async def resolve_many(self, user_ids, guild=None):
+        """Resolve vários IDs em paralelo; retorna um dict id -> usuário"""
+        unique = list(dict.fromkeys(uid for uid in user_ids if uid is not None))
+        users = await asyncio.gather(*(self.resolve(uid, guild) for uid in unique))
+        return dict(zip(unique, users))
+    
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'cached': len(self._cache)}
+    
+    async def _fetch(self, user_id):
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            user = None
+        except discord.HTTPException:
+            return None  # falha transitória: não guardar no cache
+        
+        self._cache[user_id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return user
@@ -0,0 +1,176 @@
+import discord
+import asyncio
+import heapq
+import time
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+HANDLER_RETRY_DELAY = 30  # segundos
+MAX_RETRY_DELAY = 3600     # teto do backoff de tarefas que falharam
+
+class Scheduler:
+    """Agendador central de tarefas temporizadas (unmute, unban, ...)
+    
+    As tarefas ficam persistidas na tabela `scheduled_tasks` e são
+    recarregadas no início. Em memória há apenas um heap de (run_at, id)
+    e uma tupla por tarefa, servidos por uma única task em segundo plano.
+    """
+    
+    def __init__(self, db, scope=None):
+        self.db = db
+        self.scope = scope    # (shard_count, shard_ids): só tarefas dos shards deste processo
+        self._heap = []       # (run_at, task_id)
+        self._tasks = {}      # task_id -> (kind, guild_id, target_id, channel_id, run_at)
+        self._keys = {}       # (kind, guild_id, target_id) -> task_id
+        self._handlers = {}
+        self._attempts = {}   # task_id -> falhas seguidas (para o backoff)
+        self._locks = {}      # (kind, guild_id, target_id) -> [asyncio.Lock, usuários]
+        self._wakeup = asyncio.Event()
+        self._runner = None
+        self._starting = None
+    
+    def register(self, kind, handler):
+        """Registra a corrotina `handler(guild_id, target_id, channel_id)` para um tipo"""
+        self._handlers[kind] = handler
+    
+    def unregister(self, kind):
+        self._handlers.pop(kind, None)
+    
+    def __len__(self):
+        return len(self._tasks)
+    
+    async def start(self):
+        """Recarrega as tarefas do banco e inicia o loop (idempotente, seguro em paralelo)"""
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        await self._starting
+    
+    async def _start(self):
+        for row in await self.db.get_scheduled_tasks(self.scope):
+            self._push(row['id'], row['kind'], row['guild_id'], row['target_id'],
+                       row['channel_id'], row['run_at'])
+        
+        logger.info(f"Agendador iniciado com {len(self._tasks)} tarefas pendentes")
+        self._runner = asyncio.create_task(self._run())
+    
+    def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+        self._starting = None
+        self._heap, self._tasks, self._keys, self._attempts = [], {}, {}, {}
+    
+    @asynccontextmanager
+    async def _locked(self, key):
+        """Serializa schedule/cancel de um mesmo alvo (há `await` no banco entre eles)"""
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+    
+    async def schedule(self, kind, guild_id, target_id, delay, channel_id=None):
+        """Agenda `kind` para daqui a `delay` segundos, substituindo o anterior do mesmo alvo"""
+        key = (kind, guild_id, target_id)
+        async with self._locked(key):
+            await self._cancel(key)
+            
+            run_at = time.time() + delay
+            task_id = await self.db.add_scheduled_task(kind, guild_id, target_id, channel_id, run_at)
+            self._push(task_id, kind, guild_id, target_id, channel_id, run_at)
+            return task_id
+    
+    async def cancel(self, kind, guild_id, target_id):
+        """Cancela a tarefa pendente de um alvo; retorna se havia alguma"""
+        key = (kind, guild_id, target_id)
+        async with self._locked(key):
+            return await self._cancel(key)
+    
+    async def _cancel(self, key):
+        task_id = self._keys.pop(key, None)
+        if task_id is None:
+            return False
+        
+        # Remoção preguiçosa: a entrada no heap é descartada quando chegar ao topo
+        del self._tasks[task_id]
+        self._attempts.pop(task_id, None)
+        await self.db.delete_scheduled_task(task_id)
+        self._compact()
+        return True
+    
+    def _push(self, task_id, kind, guild_id, target_id, channel_id, run_at):
+        self._tasks[task_id] = (kind, guild_id, target_id, channel_id, run_at)
+        self._keys[(kind, guild_id, target_id)] = task_id
+        heapq.heappush(self._heap, (run_at, task_id))
+        
+        # Acordar o loop se esta for a nova tarefa mais próxima
+        if self._heap[0][1] == task_id:
+            self._wakeup.set()
+    
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._tasks) + 64:
+            self._heap = [entry for entry in self._heap if entry[1] in self._tasks]
+            heapq.heapify(self._heap)
+    
+    async def _run(self):
+        while True:
+            # Descartar entradas canceladas do topo
+            while self._heap and self._heap[0][1] not in self._tasks:
+                heapq.heappop(self._heap)
+            
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            
+            run_at, task_id = self._heap[0]
+            delay = run_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            heapq.heappop(self._heap)
+            kind, guild_id, target_id, channel_id, _ = self._tasks.pop(task_id)
+            if self._keys.get((kind, guild_id, target_id)) == task_id:
+                del self._keys[(kind, guild_id, target_id)]
+            asyncio.create_task(self._dispatch(task_id, kind, guild_id, target_id, channel_id))
+    
+    async def _dispatch(self, task_id, kind, guild_id, target_id, channel_id):
+        handler = self._handlers.get(kind)
+        if not handler:
+            # O cog do handler pode ainda estar carregando: tentar de novo mais tarde
+            logger.warning(f"Nenhum handler registrado para tarefas '{kind}' (tarefa {task_id})")
+            if (kind, guild_id, target_id) not in self._keys:
+                self._push(task_id, kind, guild_id, target_id, channel_id, time.time() + HANDLER_RETRY_DELAY)
+            return
+        
+        try:
+            await handler(guild_id, target_id, channel_id)
+        except (discord.Forbidden, discord.NotFound) as e:
+            # Falha permanente (sem permissão, alvo sumiu): repetir não adianta
+            logger.error(f"Tarefa agendada {task_id} ({kind}) descartada: {e}")
+        except Exception:
+            # Falha transitória: a linha continua no banco e a tarefa volta ao heap com backoff
+            attempts = self._attempts.get(task_id, 0) + 1
+            self._attempts[task_id] = attempts
+            delay = min(HANDLER_RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+            logger.exception(f"Erro ao executar a tarefa agendada {task_id} ({kind}); "
+                             f"tentativa {attempts}, nova tentativa em {delay}s")
+            if (kind, guild_id, target_id) not in self._keys:
+                self._push(task_id, kind, guild_id, target_id, channel_id, time.time() + delay)
+                return
+            # O alvo foi reagendado enquanto o handler rodava: a tarefa nova prevalece
+        
+        self._attempts.pop(task_id, None)
+        await self.db.delete_scheduled_task(task_id)
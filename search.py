@@ -0,0 +1,163 @@
+import discord
+from discord.ext import commands
+from discord.ui import Button, View
+from datetime import datetime
+import re
+from config import Config
+from guild_settings import setup_settings, guild_role
+from metrics import track_interaction
+
+PAGE_SIZE = 5
+FILTER_PATTERN = re.compile(r'^(user|mod|action|since|until):(\S+)$', re.IGNORECASE)
+
+def parse_search(text):
+    """Separa os filtros (user:, mod:, action:, since:, until:) do texto livre"""
+    filters = {}
+    terms = []
+    for token in (text or '').split():
+        match = FILTER_PATTERN.match(token)
+        if not match:
+            terms.append(token)
+            continue
+        
+        key, value = match.group(1).lower(), match.group(2)
+        if key in ('user', 'mod'):
+            digits = re.sub(r'\D', '', value)
+            if not digits:
+                raise commands.BadArgument(f"ID inválido em `{token}`")
+            filters['moderator_id' if key == 'mod' else 'user_id'] = int(digits)
+        elif key == 'action':
+            filters['action'] = value.lower()
+        else:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise commands.BadArgument(f"Data inválida em `{token}` (use AAAA-MM-DD)")
+            filters[key] = value
+    
+    return ' '.join(terms), filters
+
+class SearchPaginator(View):
+    """Paginação de resultados: cada página é consultada sob demanda no banco"""
+    
+    def __init__(self, author_id, fetch_page, render_page):
+        super().__init__(timeout=120)
+        self.author_id = author_id
+        self.fetch_page = fetch_page
+        self.render_page = render_page
+        self.page = 0
+        self.message = None
+    
+    async def load(self):
+        # Buscar um item a mais para saber se existe próxima página
+        rows = await self.fetch_page(PAGE_SIZE + 1, self.page * PAGE_SIZE)
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = len(rows) <= PAGE_SIZE
+        return self.render_page(rows[:PAGE_SIZE], self.page)
+    
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Apenas quem pesquisou pode navegar.", ephemeral=True)
+            return False
+        return True
+    
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+    
+    @discord.ui.button(label="Anterior", style=discord.ButtonStyle.secondary, emoji="◀️")
+    @track_interaction('search.previous')
+    async def previous_page(self, interaction: discord.Interaction, button: Button):
+        self.page = max(self.page - 1, 0)
+        await interaction.response.edit_message(embed=await self.load(), view=self)
+    
+    @discord.ui.button(label="Próxima", style=discord.ButtonStyle.secondary, emoji="▶️")
+    @track_interaction('search.next')
+    async def next_page(self, interaction: discord.Interaction, button: Button):
+        self.page += 1
+        await interaction.response.edit_message(embed=await self.load(), view=self)
+
+class Search(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+    
+    async def cog_load(self):
+        await setup_settings(self.bot)
+    
+    async def send_results(self, ctx, fetch_page, render_page):
+        view = SearchPaginator(ctx.author.id, fetch_page, render_page)
+        embed = await view.load()
+        view.message = await ctx.send(embed=embed, view=view)
+    
+    @staticmethod
+    def format_date(value):
+        return discord.utils.format_dt(datetime.fromisoformat(value), 'd')
+    
+    @commands.command(name="search-cases")
+    @guild_role('mod_role')
+    async def search_cases(self, ctx, *, query: str = ""):
+        """Pesquisa casos de moderação (filtros: user: mod: action: since: until:)"""
+        text, filters = parse_search(query)
+        
+        async def fetch_page(limit, offset):
+            return await self.bot.db.search_cases(ctx.guild.id, text, limit=limit, offset=offset, **filters)
+        
+        def render_page(rows, page):
+            embed = discord.Embed(
+                title="🔎 Casos encontrados",
+                description=f"Busca: `{query}`" if query else None,
+                color=Config.COLORS['info']
+            )
+            for case in rows:
+                embed.add_field(
+                    name=f"🛡️ Caso {case['case_id']} — {case['action'].upper()}",
+                    value=f"**Usuário:** <@{case['user_id']}>\n"
+                          f"**Moderador:** <@{case['moderator_id']}>\n"
+                          f"**Motivo:** {(case['reason'] or 'Não especificado')[:200]}\n"
+                          f"**Data:** {self.format_date(case['created_at'])}",
+                    inline=False
+                )
+            if not rows:
+                embed.description = "Nenhum caso encontrado."
+            embed.set_footer(text=f"Página {page + 1}")
+            return embed
+        
+        await self.send_results(ctx, fetch_page, render_page)
+    
+    @commands.command(name="search-tickets")
+    @guild_role('mod_role')
+    async def search_tickets(self, ctx, *, query: str = ""):
+        """Pesquisa mensagens de tickets (filtros: user: since: until:)"""
+        text, filters = parse_search(query)
+        filters.pop('moderator_id', None)
+        filters.pop('action', None)
+        
+        async def fetch_page(limit, offset):
+            return await self.bot.db.search_ticket_messages(ctx.guild.id, text, limit=limit, offset=offset, **filters)
+        
+        def render_page(rows, page):
+            embed = discord.Embed(
+                title="🔎 Mensagens de tickets encontradas",
+                description=f"Busca: `{query}`" if query else None,
+                color=Config.COLORS['ticket']
+            )
+            for message in rows:
+                embed.add_field(
+                    name=f"🎫 Ticket #{message['ticket_id']}",
+                    value=f"**Autor:** <@{message['user_id']}>\n"
+                          f"**Data:** {self.format_date(message['timestamp'])}\n"
+                          f"{message['message'][:300]}",
+                    inline=False
+                )
+            if not rows:
+                embed.description = "Nenhuma mensagem encontrada."
+            embed.set_footer(text=f"Página {page + 1}")
+            return embed
+        
+        await self.send_results(ctx, fetch_page, render_page)
+
+async def setup(bot):
+    await bot.add_cog(Search(bot))
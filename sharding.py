@@ -0,0 +1,137 @@
+import discord
+from discord.ext import commands, tasks
+import time
+import logging
+from collections import Counter
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def shard_for(guild_id, shard_count):
+    """Shard responsável por um servidor (fórmula do Discord)"""
+    return (guild_id >> 22) % shard_count
+
+def parse_shard_ids(text):
+    """Converte '0-3' ou '0,2,5' em uma lista de IDs de shards"""
+    shard_ids = []
+    for part in filter(None, (p.strip() for p in (text or '').split(','))):
+        start, _, end = part.partition('-')
+        shard_ids.extend(range(int(start), int(end or start) + 1))
+    return shard_ids
+
+def shard_scope(bot):
+    """(shard_count, shard_ids) quando o processo atende só parte dos shards, senão None
+    
+    Cada servidor pertence a um único shard, logo a um único processo:
+    caches por servidor ficam locais, e o que está no banco (tarefas
+    agendadas, limpeza de tickets) é filtrado por este escopo.
+    """
+    shard_ids = getattr(bot, 'shard_ids', None)
+    if not shard_ids or not bot.shard_count or len(shard_ids) == bot.shard_count:
+        return None
+    return bot.shard_count, tuple(shard_ids)
+
+class ShardMonitor(commands.Cog):
+    """Vazão de eventos por shard e estado das conexões"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.events = Counter()    # shard_id -> eventos desde o início
+        self._last = Counter()
+        self._last_time = time.monotonic()
+        self.report.change_interval(seconds=Config.SHARD_STATS_INTERVAL)
+        self.report.start()
+    
+    def cog_unload(self):
+        self.report.cancel()
+    
+    def count(self, guild_id):
+        if guild_id and self.bot.shard_count:
+            self.events[shard_for(guild_id, self.bot.shard_count)] += 1
+        else:
+            self.events[0] += 1
+    
+    def rates(self):
+        """Eventos por segundo de cada shard desde a última leitura"""
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-9)
+        rates = {shard_id: (self.events[shard_id] - self._last[shard_id]) / elapsed for shard_id in self.events}
+        self._last = self.events.copy()
+        self._last_time = now
+        return rates
+    
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        self.count(message.guild.id if message.guild else None)
+    
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        self.count(payload.guild_id)
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self.count(payload.guild_id)
+    
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        self.count(payload.guild_id)
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        self.count(member.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload):
+        self.count(payload.guild_id)
+    
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction):
+        self.count(interaction.guild_id)
+    
+    @commands.Cog.listener()
+    async def on_shard_ready(self, shard_id):
+        logger.info(f"Shard {shard_id} pronto")
+    
+    @commands.Cog.listener()
+    async def on_shard_disconnect(self, shard_id):
+        logger.warning(f"Shard {shard_id} desconectado")
+    
+    @commands.Cog.listener()
+    async def on_shard_resumed(self, shard_id):
+        logger.info(f"Shard {shard_id} retomado")
+    
+    @tasks.loop(minutes=5)
+    async def report(self):
+        rates = self.rates()
+        if rates:
+            logger.info("Eventos/s por shard: " + ', '.join(
+                f"{shard_id}={rate:.1f}" for shard_id, rate in sorted(rates.items())
+            ))
+    
+    @report.before_loop
+    async def before_report(self):
+        await self.bot.wait_until_ready()
+    
+    @commands.command(name="shards")
+    @commands.has_permissions(administrator=True)
+    async def shards(self, ctx):
+        """Mostra latência, servidores e vazão de cada shard deste processo"""
+        guilds = Counter(guild.shard_id for guild in self.bot.guilds)
+        embed = discord.Embed(
+            title="🧩 Shards",
+            description=f"Total de shards: {self.bot.shard_count or 1} | "
+                        f"Worker de IDs: {Config.ID_WORKER_ID}",
+            color=Config.COLORS['info']
+        )
+        latencies = getattr(self.bot, 'latencies', None) or [(0, self.bot.latency)]
+        for shard_id, latency in latencies:
+            embed.add_field(
+                name=f"Shard {shard_id}" + (" (este)" if ctx.guild.shard_id == shard_id else ""),
+                value=f"**Latência:** {latency * 1000:.0f}ms\n"
+                      f"**Servidores:** {guilds[shard_id]}\n"
+                      f"**Eventos:** {self.events[shard_id]}",
+            )
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(ShardMonitor(bot))
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import discord
+from log_dispatcher import LogDispatcher, MAX_EMBEDS_PER_MESSAGE, MAX_EMBED_CHARS_PER_MESSAGE
+
+def make_bot(*channel_ids):
+    channels = {channel_id: SimpleNamespace(id=channel_id, send=AsyncMock()) for channel_id in channel_ids}
+    return SimpleNamespace(get_channel=channels.get), channels
+
+def embed(i, size=0):
+    return discord.Embed(title=f"Log {i}", description='x' * size)
+
+def sent_batches(channel):
+    return [call.kwargs['embeds'] for call in channel.send.await_args_list]
+
+def test_burst_is_batched_per_channel():
+    async def main():
+        bot, channels = make_bot(1, 2)
+        dispatcher = LogDispatcher(bot, interval=0.01)
+        for i in range(25):
+            dispatcher.send(1, embed(i))
+        for i in range(3):
+            dispatcher.send(2, embed(i))
+        await asyncio.sleep(0.1)
+        
+        # 28 eventos viram 4 mensagens, na ordem em que foram enviados
+        batches = sent_batches(channels[1])
+        assert [len(batch) for batch in batches] == [10, 10, 5]
+        assert [e.title for batch in batches for e in batch] == [f"Log {i}" for i in range(25)]
+        assert [len(batch) for batch in sent_batches(channels[2])] == [3]
+        assert dispatcher.stats()['messages'] == 4
+        assert dispatcher.stats()['embeds'] == 28
+        await dispatcher.stop()
+    
+    asyncio.run(main())
+
+def test_pack_respects_embed_and_char_limits():
+    small = [embed(i) for i in range(MAX_EMBEDS_PER_MESSAGE + 1)]
+    assert [len(batch) for batch in LogDispatcher.pack(small)] == [MAX_EMBEDS_PER_MESSAGE, 1]
+    
+    large = [embed(i, size=2500) for i in range(5)]
+    batches = list(LogDispatcher.pack(large))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert all(sum(len(e) for e in batch) <= MAX_EMBED_CHARS_PER_MESSAGE for batch in batches)
+
+def test_stop_flushes_pending_embeds():
+    async def main():
+        bot, channels = make_bot(1)
+        dispatcher = LogDispatcher(bot, interval=60)
+        for i in range(3):
+            dispatcher.send(1, embed(i))
+        channels[1].send.assert_not_awaited()
+        
+        await dispatcher.stop()
+        assert [len(batch) for batch in sent_batches(channels[1])] == [3]
+        assert dispatcher.stats()['pending'] == 0
+    
+    asyncio.run(main())
+
+def test_rate_limit_is_retried_after_retry_after(monkeypatch):
+    async def main():
+        bot, channels = make_bot(1)
+        response = SimpleNamespace(status=429, reason='Too Many Requests', headers={'Retry-After': '3'})
+        channels[1].send.side_effect = [discord.HTTPException(response, 'rate limited'), None]
+        sleep = AsyncMock()
+        monkeypatch.setattr(asyncio, 'sleep', sleep)
+        
+        dispatcher = LogDispatcher(bot, interval=60, max_retries=3)
+        await dispatcher._send_with_retry(channels[1], [embed(0)])
+        
+        sleep.assert_awaited_once_with(3.0)
+        assert channels[1].send.await_count == 2
+        assert dispatcher.stats()['messages'] == 1
+    
+    asyncio.run(main())
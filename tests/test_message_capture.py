@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from message_capture import MessageCapture
+
+def fake_message(message_id, content='oi'):
+    return SimpleNamespace(
+        id=message_id, content=content, created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        author=SimpleNamespace(id=1, name='autor')
+    )
+
+class FlakyDB:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.saved = []
+    
+    async def save_ticket_messages(self, inserts, edits, deletes):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError('database is locked')
+        self.saved.append((inserts, edits, deletes))
+    
+    async def get_last_ticket_message_id(self, ticket_id):
+        return max((row[1] for inserts, _, _ in self.saved for row in inserts), default=None)
+
+class FakeChannel:
+    def __init__(self, messages):
+        self.messages = messages
+    
+    async def history(self, limit=None, after=None, oldest_first=True):
+        for message in self.messages:
+            if after is None or message.id > after.id:
+                yield message
+
+def test_failed_flush_keeps_batch_in_order():
+    async def main():
+        db = FlakyDB(failures=1)
+        capture = MessageCapture(db, interval=60, max_buffer=100)
+        capture.add('T1', fake_message(1))
+        await capture.flush()
+        assert len(capture) == 1 and capture.failed == 1
+        
+        capture.add('T1', fake_message(2))
+        capture.edit(1, 'editada')
+        await capture.flush()
+        assert len(capture) == 0
+        inserts, edits, _ = db.saved[0]
+        assert [row[1] for row in inserts] == [1, 2]
+        assert [row[2] for row in edits] == [1]
+    
+    asyncio.run(main())
+
+def test_buffer_is_capped_dropping_oldest_inserts():
+    async def main():
+        db = FlakyDB(failures=1)
+        capture = MessageCapture(db, interval=60, max_buffer=100, max_pending=3)
+        for message_id in range(5):
+            capture.add('T1', fake_message(message_id))
+        capture.delete(0)
+        await capture.flush()
+        
+        assert len(capture) == 3 and capture.dropped == 3
+        assert [row[1] for row in capture._inserts] == [3, 4]
+        assert len(capture._deletes) == 1
+    
+    asyncio.run(main())
+
+def test_backfill_recovers_messages_after_last_stored():
+    async def main():
+        db = FlakyDB()
+        capture = MessageCapture(db, interval=60, max_buffer=100)
+        capture.add('T1', fake_message(1))
+        await capture.flush()
+        
+        channel = FakeChannel([fake_message(message_id) for message_id in (1, 2, 3)])
+        assert await capture.backfill('T1', channel) == 2
+        await capture.flush()
+        assert [row[1] for row in db.saved[1][0]] == [2, 3]
+    
+    asyncio.run(main())
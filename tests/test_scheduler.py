@@ -0,0 +1,69 @@
+import asyncio
+from scheduler import Scheduler
+
+class FakeDB:
+    def __init__(self):
+        self.rows = {}
+        self.next_id = 0
+    
+    async def get_scheduled_tasks(self, scope):
+        return []
+    
+    async def add_scheduled_task(self, kind, guild_id, target_id, channel_id, run_at):
+        await asyncio.sleep(0)  # ceder o loop como a thread escritora faria
+        self.next_id += 1
+        self.rows[self.next_id] = (kind, guild_id, target_id, run_at)
+        return self.next_id
+    
+    async def delete_scheduled_task(self, task_id):
+        await asyncio.sleep(0)
+        self.rows.pop(task_id, None)
+
+def test_concurrent_reschedule_keeps_one_task():
+    async def main():
+        db = FakeDB()
+        scheduler = Scheduler(db)
+        fired = []
+        
+        async def handler(guild_id, target_id, channel_id):
+            fired.append(target_id)
+        
+        scheduler.register('unmute', handler)
+        await scheduler.start()
+        await asyncio.gather(*(scheduler.schedule('unmute', 1, 2, 0.05) for _ in range(5)))
+        
+        assert len(scheduler) == 1
+        assert len(db.rows) == 1
+        
+        # Um .unmute depois dos re-agendamentos cancela tudo
+        assert await scheduler.cancel('unmute', 1, 2)
+        await asyncio.sleep(0.1)
+        assert fired == []
+        assert db.rows == {}
+        scheduler.stop()
+    
+    asyncio.run(main())
+
+def test_fired_task_does_not_drop_newer_key():
+    async def main():
+        db = FakeDB()
+        scheduler = Scheduler(db)
+        fired = []
+        
+        async def handler(guild_id, target_id, channel_id):
+            fired.append(target_id)
+        
+        scheduler.register('unmute', handler)
+        await scheduler.start()
+        
+        # Duas tarefas vivas para o mesmo alvo, como antes do lock
+        scheduler._push(100, 'unmute', 1, 2, None, 0)
+        scheduler._push(101, 'unmute', 1, 2, None, 10 ** 10)
+        await asyncio.sleep(0.05)
+        
+        assert fired == [2]
+        assert scheduler._keys == {('unmute', 1, 2): 101}
+        assert await scheduler.cancel('unmute', 1, 2)
+        scheduler.stop()
+    
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import asyncio
+from ticket_index import OpenTicketIndex
+
+class StubDB:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+    
+    async def get_open_tickets(self, scope=None):
+        await asyncio.sleep(0)
+        return self.rows
+
+async def open_ticket(index, user_id, max_tickets, ticket_id, fail=False):
+    """Mesmo fluxo do botão: reserva, `await` na criação do canal, confirma"""
+    reservation = index.reserve(1, user_id, max_tickets)
+    if reservation is None:
+        return False
+    with reservation:
+        await asyncio.sleep(0)
+        if fail:
+            raise RuntimeError('falha ao criar o canal')
+        reservation.confirm(ticket_id)
+    return True
+
+def test_concurrent_clicks_respect_limit():
+    async def main():
+        index = OpenTicketIndex(StubDB())
+        await index.load()
+        max_tickets = 3
+        results = await asyncio.gather(*(open_ticket(index, 7, max_tickets, f'T{i}') for i in range(100)))
+        
+        assert sum(results) == max_tickets
+        assert index.count(1, 7) == max_tickets
+        assert len(index) == max_tickets
+    
+    asyncio.run(main())
+
+def test_existing_tickets_count_towards_limit():
+    async def main():
+        index = OpenTicketIndex(StubDB([{'guild_id': 1, 'user_id': 7, 'ticket_id': 'OLD'}]))
+        await index.load()
+        results = await asyncio.gather(*(open_ticket(index, 7, 2, f'T{i}') for i in range(100)))
+        assert sum(results) == 1
+    
+    asyncio.run(main())
+
+def test_failed_creation_releases_slot():
+    async def main():
+        index = OpenTicketIndex(StubDB())
+        await index.load()
+        results = await asyncio.gather(
+            *(open_ticket(index, 7, 1, f'T{i}', fail=True) for i in range(100)),
+            return_exceptions=True
+        )
+        assert sum(isinstance(result, RuntimeError) for result in results) == 1
+        assert index.count(1, 7) == 0
+        
+        # A vaga liberada pode ser usada de novo
+        assert await open_ticket(index, 7, 1, 'T-ok')
+        index.closed('T-ok')
+        assert index.count(1, 7) == 0
+    
+    asyncio.run(main())
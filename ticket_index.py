@@ -0,0 +1,98 @@
+import asyncio
+from collections import Counter
+
+class Reservation:
+    """Vaga reservada para um ticket em criação
+    
+    Usada como `with`: se `confirm()` não for chamado (categoria ausente,
+    erro ao criar o canal...), a vaga é devolvida ao sair do bloco.
+    """
+    
+    def __init__(self, index, key):
+        self.index = index
+        self.key = key
+        self.done = False
+    
+    def confirm(self, ticket_id):
+        if not self.done:
+            self.done = True
+            self.index._unpend(self.key)
+            self.index._add(self.key, ticket_id)
+    
+    def release(self):
+        if not self.done:
+            self.done = True
+            self.index._unpend(self.key)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.release()
+
+class OpenTicketIndex:
+    """Tickets abertos por (servidor, usuário), mantidos em memória
+    
+    Reconstruído do banco no início e atualizado ao criar, fechar e
+    reabrir tickets. A verificação do limite e a reserva da vaga acontecem
+    sem nenhum `await` entre elas, então cliques simultâneos não passam
+    do limite. Cada servidor pertence a um único shard (e processo), logo
+    o índice local é a fonte da verdade para os servidores atendidos.
+    """
+    
+    def __init__(self, db, scope=None):
+        self.db = db
+        self.scope = scope
+        self._open = {}           # (guild_id, user_id) -> {ticket_id}
+        self._owners = {}         # ticket_id -> (guild_id, user_id)
+        self._pending = Counter()  # (guild_id, user_id) -> tickets em criação
+        self._loading = None
+    
+    async def load(self):
+        """Carrega os tickets abertos (chamadas simultâneas compartilham a leitura)"""
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+        await self._loading
+    
+    async def _load(self):
+        self._open, self._owners = {}, {}
+        for row in await self.db.get_open_tickets(self.scope):
+            self._add((row['guild_id'], row['user_id']), row['ticket_id'])
+    
+    def _add(self, key, ticket_id):
+        self._open.setdefault(key, set()).add(ticket_id)
+        self._owners[ticket_id] = key
+    
+    def _unpend(self, key):
+        self._pending[key] -= 1
+        if self._pending[key] <= 0:
+            del self._pending[key]
+    
+    def count(self, guild_id, user_id):
+        """Tickets abertos mais os que estão sendo criados"""
+        key = (guild_id, user_id)
+        return len(self._open.get(key, ())) + self._pending[key]
+    
+    def reserve(self, guild_id, user_id, limit):
+        """Reserva uma vaga se o usuário está abaixo do limite; senão retorna None"""
+        if self.count(guild_id, user_id) >= limit:
+            return None
+        key = (guild_id, user_id)
+        self._pending[key] += 1
+        return Reservation(self, key)
+    
+    def opened(self, guild_id, user_id, ticket_id):
+        """Registra um ticket aberto fora de uma reserva (ex.: reaberto)"""
+        self._add((guild_id, user_id), ticket_id)
+    
+    def closed(self, ticket_id):
+        key = self._owners.pop(ticket_id, None)
+        if key is None:
+            return
+        tickets = self._open.get(key)
+        tickets.discard(ticket_id)
+        if not tickets:
+            del self._open[key]
+    
+    def __len__(self):
+        return len(self._owners)
@@ -0,0 +1,175 @@
+import discord
+import asyncio
+import logging
+from collections import deque
+from config import Config
+from ids import new_id, is_time_id
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'ticket-'
+
+def ticket_overwrites(guild, settings, user=None):
+    """Permissões de um canal de ticket: oculto para todos, visível para a equipe e o autor"""
+    overwrites = {guild.default_role: discord.PermissionOverwrite(read_messages=False)}
+    support = guild.get_role(settings.get(guild.id, 'support_role'))
+    if support:
+        overwrites[support] = discord.PermissionOverwrite(
+            read_messages=True, send_messages=True, manage_messages=True
+        )
+    admin = guild.get_role(settings.get(guild.id, 'admin_role'))
+    if admin:
+        overwrites[admin] = discord.PermissionOverwrite(
+            read_messages=True, send_messages=True, manage_messages=True, manage_channels=True
+        )
+    if user:
+        overwrites[user] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+    return overwrites
+
+def closed_overwrites(guild, settings):
+    """Permissões de um ticket fechado: visível apenas para a administração"""
+    overwrites = {guild.default_role: discord.PermissionOverwrite(read_messages=False)}
+    admin = guild.get_role(settings.get(guild.id, 'admin_role'))
+    if admin:
+        overwrites[admin] = discord.PermissionOverwrite(read_messages=True)
+    return overwrites
+
+class TicketChannelPool:
+    """Canais de ticket pré-criados e ocultos, reabastecidos em segundo plano
+    
+    Abrir um ticket passa a ser retirar um canal do pool e aplicar as
+    permissões do autor numa única chamada. O ID do ticket é gerado junto
+    com o canal (renomear canais tem limite de 2 por 10 minutos). Canais
+    do pool não têm registro no banco, e é assim que são reconhecidos
+    depois de um reinício.
+    """
+    
+    def __init__(self, bot, size=None, refill_delay=None):
+        self.bot = bot
+        self.size = Config.TICKET_POOL_SIZE if size is None else size
+        self.refill_delay = Config.TICKET_POOL_REFILL_DELAY if refill_delay is None else refill_delay
+        self._channels = {}    # guild_id -> deque de (channel_id, ticket_id)
+        self._dirty = set()    # servidores com pool abaixo do tamanho
+        self._wakeup = asyncio.Event()
+        self._runner = None
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.failed = 0
+    
+    async def start(self):
+        """Recupera os canais livres existentes e inicia o reabastecimento (idempotente)"""
+        if self.size <= 0 or self._runner:
+            return
+        self._runner = asyncio.create_task(self._run())
+        for guild in self.bot.guilds:
+            await self._discover(guild)
+            self.refill(guild.id)
+    
+    def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+    
+    def category(self, guild):
+        return discord.utils.get(guild.categories, id=self.bot.settings.get(guild.id, 'ticket_category'))
+    
+    async def _discover(self, guild):
+        category = self.category(guild)
+        if not category:
+            return
+        
+        candidates = {
+            channel.id: channel.name[len(CHANNEL_PREFIX):].upper()
+            for channel in category.text_channels
+            if channel.name.startswith(CHANNEL_PREFIX) and is_time_id(channel.name[len(CHANNEL_PREFIX):].upper())
+        }
+        if not candidates:
+            return
+        
+        used = await self.bot.db.get_ticket_channel_ids(list(candidates))
+        pool = self._channels.setdefault(guild.id, deque())
+        known = {channel_id for channel_id, _ in pool}
+        for channel_id, ticket_id in candidates.items():
+            if channel_id not in used and channel_id not in known:
+                pool.append((channel_id, ticket_id))
+        if pool:
+            logger.info(f"{len(pool)} canais livres recuperados no servidor {guild.id}")
+    
+    def refill(self, guild_id):
+        """Pede o reabastecimento do pool de um servidor"""
+        if self._runner:
+            self._dirty.add(guild_id)
+            self._wakeup.set()
+    
+    def take(self, guild):
+        """Retira um canal livre do pool; retorna (canal, ticket_id) ou None"""
+        if self.size <= 0:
+            return None
+        
+        pool = self._channels.get(guild.id)
+        category_id = self.bot.settings.get(guild.id, 'ticket_category')
+        self.refill(guild.id)
+        while pool:
+            channel_id, ticket_id = pool.popleft()
+            channel = guild.get_channel(channel_id)
+            # Canais apagados ou de uma categoria antiga são descartados
+            if channel and channel.category_id == category_id:
+                self.hits += 1
+                return channel, ticket_id
+        
+        self.misses += 1
+        return None
+    
+    def discard(self, channel):
+        """Tira do pool um canal apagado"""
+        pool = self._channels.get(channel.guild.id)
+        if pool:
+            for entry in pool:
+                if entry[0] == channel.id:
+                    pool.remove(entry)
+                    self.refill(channel.guild.id)
+                    break
+    
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._dirty:
+                guild = self.bot.get_guild(self._dirty.pop())
+                if not guild:
+                    continue
+                try:
+                    await self._fill(guild)
+                except Exception as e:
+                    logger.error(f"Erro ao reabastecer o pool do servidor {guild.id}: {e}")
+    
+    async def _fill(self, guild):
+        category = self.category(guild)
+        if not category:
+            return
+        
+        pool = self._channels.setdefault(guild.id, deque())
+        while len(pool) < self.size:
+            ticket_id = new_id()
+            try:
+                channel = await category.create_text_channel(
+                    name=f"{CHANNEL_PREFIX}{ticket_id}",
+                    overwrites=ticket_overwrites(guild, self.bot.settings),
+                    topic=f"Ticket | ID: {ticket_id}",
+                    reason="Pool de canais de ticket"
+                )
+            except discord.HTTPException as e:
+                self.failed += 1
+                logger.warning(f"Falha ao criar canal do pool no servidor {guild.id}: {e}")
+                return
+            
+            pool.append((channel.id, ticket_id))
+            self.created += 1
+            await asyncio.sleep(self.refill_delay)
+    
+    def stats(self):
+        return {
+            'size': self.size, 'available': sum(len(pool) for pool in self._channels.values()),
+            'hits': self.hits, 'misses': self.misses, 'created': self.created, 'failed': self.failed
+        }
@@ -2,64 +2,88 @@ import discord
 from discord.ext import commands
 from discord.ui import Button, View, Select
 import asyncio
+import logging
 from datetime import datetime
-import random
-import string
 from config import Config
+from transcripts import transcript_file, history_rows, stored_rows
+from message_capture import MessageCapture
+from ids import new_id
+from guild_settings import setup_settings, guild_role
+from ticket_pool import ticket_overwrites, closed_overwrites
+from sharding import shard_scope
+from metrics import track_interaction
+
+logger = logging.getLogger(__name__)
 
 class TicketView(View):
     def __init__(self):
         super().__init__(timeout=None)
     
+    async def create_ticket(self, interaction, reservation):
+        """Cria (ou retira do pool) o canal e o registro do ticket, confirmando a vaga"""
+        client = interaction.client
+        guild = interaction.guild
+        overwrites = ticket_overwrites(guild, client.settings, interaction.user)
+        
+        # Canal pré-criado: só aplicar as permissões do autor
+        pooled = client.ticket_pool.take(guild)
+        if pooled:
+            channel, ticket_id = pooled
+            await channel.edit(overwrites=overwrites)
+        else:
+            category = client.ticket_pool.category(guild)
+            if not category:
+                await interaction.followup.send("❌ Categoria de tickets não configurada.", ephemeral=True)
+                return None, None
+            
+            # Gerar ID único (ordenado pelo tempo) para o ticket
+            ticket_id = new_id()
+            channel = await category.create_text_channel(
+                name=f"ticket-{ticket_id}",
+                overwrites=overwrites,
+                topic=f"Ticket de {interaction.user.name} | ID: {ticket_id}"
+            )
+        
+        # Salvar no banco de dados
+        await client.db.create_ticket(ticket_id, interaction.user.id, channel.id, "support", guild_id=guild.id)
+        reservation.confirm(ticket_id)
+        system = client.get_cog("TicketSystem")
+        if system:
+            system.ticket_channels[channel.id] = ticket_id
+        return channel, ticket_id
+    
     @discord.ui.button(label="Abrir Ticket", style=discord.ButtonStyle.primary, emoji="📩", custom_id="open_ticket")
+    @track_interaction('ticket.open')
     async def open_ticket(self, interaction: discord.Interaction, button: Button):
         await interaction.response.defer(ephemeral=True)
         
-        db = interaction.client.db
-        user_tickets = await db.get_user_tickets(interaction.user.id)
+        settings = interaction.client.settings
+        index = interaction.client.ticket_index
+        guild = interaction.guild
         
-        # Verificar limite de tickets
-        open_tickets = [t for t in user_tickets if t['status'] == 'open']
-        if len(open_tickets) >= Config.MAX_TICKETS_PER_USER:
+        # Verificar limite e reservar a vaga de uma vez (índice em memória, O(1))
+        max_tickets = settings.get(guild.id, 'max_tickets')
+        reservation = index.reserve(guild.id, interaction.user.id, max_tickets)
+        if reservation is None:
             await interaction.followup.send(
-                f"❌ Você já tem {len(open_tickets)} tickets abertos. "
-                f"O máximo permitido é {Config.MAX_TICKETS_PER_USER}.",
+                f"❌ Você já tem {index.count(guild.id, interaction.user.id)} tickets abertos. "
+                f"O máximo permitido é {max_tickets}.",
                 ephemeral=True
             )
             return
         
-        # Gerar ID único para o ticket
-        ticket_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        
-        # Obter categoria
-        guild = interaction.guild
-        category = discord.utils.get(guild.categories, id=Config.TICKET_CATEGORY)
-        
-        if not category:
-            await interaction.followup.send("❌ Categoria de tickets não configurada.", ephemeral=True)
+        # A vaga volta ao índice se o ticket não chegar a ser salvo
+        with reservation:
+            channel, ticket_id = await self.create_ticket(interaction, reservation)
+        if channel is None:
             return
         
-        # Criar canal do ticket
-        overwrites = {
-            guild.default_role: discord.PermissionOverwrite(read_messages=False),
-            interaction.user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-            guild.get_role(Config.SUPPORT_ROLE): discord.PermissionOverwrite(
-                read_messages=True, send_messages=True, manage_messages=True
-            ),
-            guild.get_role(Config.ADMIN_ROLE): discord.PermissionOverwrite(
-                read_messages=True, send_messages=True, manage_messages=True, manage_channels=True
-            )
-        }
-        
-        channel = await category.create_text_channel(
-            name=f"ticket-{ticket_id}",
-            overwrites=overwrites,
-            topic=f"Ticket de {interaction.user.name} | ID: {ticket_id}"
+        # Responder logo; boas-vindas e log vêm depois
+        await interaction.followup.send(
+            f"✅ Ticket criado com sucesso! Acesse em {channel.mention}",
+            ephemeral=True
         )
         
-        # Salvar no banco de dados
-        await db.create_ticket(ticket_id, interaction.user.id, channel.id, "support")
-        
         # Embed de boas-vindas
         embed = discord.Embed(
             title=f"Ticket #{ticket_id}",
@@ -71,102 +95,118 @@ class TicketView(View):
         embed.add_field(name="Data", value=discord.utils.format_dt(datetime.now(), 'F'))
         embed.set_footer(text="Use os botões abaixo para interagir com o ticket.")
         
-        # View com ações do ticket
-        ticket_view = TicketActionsView(ticket_id)
-        
         await channel.send(
-            content=f"{interaction.user.mention} | <@&{Config.SUPPORT_ROLE}>",
+            content=f"{interaction.user.mention} | <@&{settings.get(guild.id, 'support_role')}>",
             embed=embed,
-            view=ticket_view
+            view=TicketActionsView()
         )
         
         # Log
-        log_channel = guild.get_channel(Config.TICKET_LOG_CHANNEL)
-        if log_channel:
-            log_embed = discord.Embed(
-                title="🎫 Ticket Criado",
-                color=Config.COLORS['success']
-            )
-            log_embed.add_field(name="ID", value=ticket_id)
-            log_embed.add_field(name="Usuário", value=f"{interaction.user.mention}\n({interaction.user.id})")
-            log_embed.add_field(name="Canal", value=channel.mention)
-            await log_channel.send(embed=log_embed)
-        
-        await interaction.followup.send(
-            f"✅ Ticket criado com sucesso! Acesse em {channel.mention}",
-            ephemeral=True
+        log_embed = discord.Embed(
+            title="🎫 Ticket Criado",
+            color=Config.COLORS['success']
         )
+        log_embed.add_field(name="ID", value=ticket_id)
+        log_embed.add_field(name="Usuário", value=f"{interaction.user.mention}\n({interaction.user.id})")
+        log_embed.add_field(name="Canal", value=channel.mention)
+        interaction.client.log_dispatcher.send(settings.get(guild.id, 'ticket_log_channel'), log_embed)
 
-class TicketActionsView(View):
-    def __init__(self, ticket_id):
-        super().__init__(timeout=None)
-        self.ticket_id = ticket_id
+# ação -> (rótulo, estilo, emoji); o custom_id do botão é "<ação>_"
+TICKET_ACTIONS = {
+    'close_ticket': ("Fechar", discord.ButtonStyle.danger, "🔒"),
+    'transcript': ("Transcrever", discord.ButtonStyle.secondary, "📄"),
+    'reopen_ticket': ("Reabrir", discord.ButtonStyle.success, "🔓"),
+}
+
+class TicketActionButton(discord.ui.DynamicItem[Button], template=r'(?P<action>close_ticket|transcript|reopen_ticket)_'):
+    """Botão de ação de ticket, registrado uma única vez para todos os canais
     
-    @discord.ui.button(label="Fechar", style=discord.ButtonStyle.danger, emoji="🔒", custom_id=f"close_ticket_")
-    async def close_ticket(self, interaction: discord.Interaction, button: Button):
-        await interaction.response.defer()
+    O ticket é resolvido pelo canal da interação (cache channel_id ->
+    ticket_id), então os botões continuam funcionando depois de reinícios
+    e nenhuma view fica guardada por mensagem.
+    """
+    
+    def __init__(self, action):
+        label, style, emoji = TICKET_ACTIONS[action]
+        super().__init__(Button(label=label, style=style, emoji=emoji, custom_id=f"{action}_"))
+        self.action = action
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['action'])
+    
+    async def callback(self, interaction: discord.Interaction):
+        system = interaction.client.get_cog("TicketSystem")
+        ticket_id = await system.get_channel_ticket(interaction.channel_id) if system else None
+        if not ticket_id:
+            await interaction.response.send_message("❌ Este não é um canal de ticket válido.", ephemeral=True)
+            return
         
+        await getattr(self, self.action)(interaction, ticket_id)
+    
+    @track_interaction('ticket.close')
+    async def close_ticket(self, interaction, ticket_id):
         # Verificar permissões
-        if not any(role.id in [Config.SUPPORT_ROLE, Config.ADMIN_ROLE, Config.MOD_ROLE] 
-                  for role in interaction.user.roles):
-            await interaction.followup.send("❌ Você não tem permissão para fechar tickets.", ephemeral=True)
+        if not interaction.client.settings.has_role(interaction.user, 'support_role', 'admin_role', 'mod_role'):
+            await interaction.response.send_message("❌ Você não tem permissão para fechar tickets.", ephemeral=True)
             return
         
         # Modal para motivo do fechamento
-        modal = CloseTicketModal(self.ticket_id)
-        await interaction.followup.send_modal(modal)
+        await interaction.response.send_modal(CloseTicketModal(ticket_id))
     
-    @discord.ui.button(label="Transcrever", style=discord.ButtonStyle.secondary, emoji="📄", custom_id=f"transcript_")
-    async def transcript_ticket(self, interaction: discord.Interaction, button: Button):
+    @track_interaction('ticket.transcript')
+    async def transcript(self, interaction, ticket_id):
         await interaction.response.defer()
         
-        if not any(role.id in [Config.SUPPORT_ROLE, Config.ADMIN_ROLE, Config.MOD_ROLE] 
-                  for role in interaction.user.roles):
+        if not interaction.client.settings.has_role(interaction.user, 'support_role', 'admin_role', 'mod_role'):
             await interaction.followup.send("❌ Permissão negada.", ephemeral=True)
             return
         
-        # Criar transcrição
-        messages = []
-        async for message in interaction.channel.history(limit=500, oldest_first=True):
-            messages.append(f"{message.author.name} ({message.author.id}) [{message.created_at}]: {message.content}")
-        
-        transcript = "\n".join(messages)
-        
-        # Salvar em arquivo
-        filename = f"transcript_{self.ticket_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(transcript)
-        
-        await interaction.followup.send(
-            f"📄 Transcrição criada!",
-            file=discord.File(filename),
-            ephemeral=True
-        )
+        # Tickets com captura completa usam o banco local; os demais, o histórico do Discord
+        db = interaction.client.db
+        ticket = await db.get_ticket(ticket_id)
+        system = interaction.client.get_cog("TicketSystem")
+        if ticket and ticket['messages_captured'] and system:
+            # Completar com o histórico o que o banco ainda não tem (lote perdido, bot fora do ar)
+            await system.capture.flush()
+            await system.capture.backfill(ticket_id, interaction.channel)
+            await system.capture.flush()
+            rows = stored_rows(db, ticket_id)
+        else:
+            rows = history_rows(interaction.channel)
+        
+        # Criar transcrição (em streaming, arquivo temporário removido após o envio)
+        async with transcript_file(rows, ticket_id) as transcript:
+            await interaction.followup.send(
+                f"📄 Transcrição criada! ({transcript.count} mensagens)",
+                file=discord.File(transcript.path, filename=transcript.filename),
+                ephemeral=True
+            )
     
-    @discord.ui.button(label="Reabrir", style=discord.ButtonStyle.success, emoji="🔓", custom_id=f"reopen_ticket_")
-    async def reopen_ticket(self, interaction: discord.Interaction, button: Button):
+    @track_interaction('ticket.reopen')
+    async def reopen_ticket(self, interaction, ticket_id):
         await interaction.response.defer()
         
-        if not any(role.id in [Config.ADMIN_ROLE, Config.MOD_ROLE] for role in interaction.user.roles):
+        if not interaction.client.settings.has_role(interaction.user, 'admin_role', 'mod_role'):
             await interaction.followup.send("❌ Apenas moderadores podem reabrir tickets.", ephemeral=True)
             return
         
         db = interaction.client.db
-        ticket = await db.get_ticket(self.ticket_id)
+        ticket = await db.get_ticket(ticket_id)
         
         if not ticket:
             await interaction.followup.send("❌ Ticket não encontrado.", ephemeral=True)
             return
         
         # Mover para categoria aberta
-        category = discord.utils.get(interaction.guild.categories, id=Config.TICKET_CATEGORY)
+        category = discord.utils.get(interaction.guild.categories,
+                                     id=interaction.client.settings.get(interaction.guild.id, 'ticket_category'))
         if category:
             await interaction.channel.edit(category=category)
         
         # Atualizar status
-        with db.get_connection() as conn:
-            conn.execute('UPDATE tickets SET status = "open", closed_at = NULL WHERE ticket_id = ?', 
-                        (self.ticket_id,))
+        await db.reopen_ticket(ticket_id)
+        interaction.client.ticket_index.opened(ticket['guild_id'], ticket['user_id'], ticket_id)
         
         embed = discord.Embed(
             title="🔓 Ticket Reaberto",
@@ -176,6 +216,14 @@ class TicketActionsView(View):
         await interaction.channel.send(embed=embed)
         await interaction.followup.send("✅ Ticket reaberto com sucesso!")
 
+class TicketActionsView(View):
+    """Botões de ação enviados na mensagem de boas-vindas de cada ticket"""
+    
+    def __init__(self):
+        super().__init__(timeout=None)
+        for action in TICKET_ACTIONS:
+            self.add_item(TicketActionButton(action))
+
 class CloseTicketModal(discord.ui.Modal, title="Fechar Ticket"):
     def __init__(self, ticket_id):
         super().__init__()
@@ -190,6 +238,7 @@ class CloseTicketModal(discord.ui.Modal, title="Fechar Ticket"):
         )
         self.add_item(self.reason)
     
+    @track_interaction('ticket.close_submit')
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer()
         
@@ -197,18 +246,17 @@ class CloseTicketModal(discord.ui.Modal, title="Fechar Ticket"):
         
         # Fechar no banco de dados
         await db.close_ticket(self.ticket_id, interaction.user.id, self.reason.value)
+        interaction.client.ticket_index.closed(self.ticket_id)
         
         # Mover para categoria de fechados
         guild = interaction.guild
-        closed_category = discord.utils.get(guild.categories, id=Config.CLOSED_CATEGORY)
+        settings = interaction.client.settings
+        closed_category = discord.utils.get(guild.categories, id=settings.get(guild.id, 'closed_category'))
         
         if closed_category:
             await interaction.channel.edit(
                 category=closed_category,
-                overwrites={
-                    guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                    guild.get_role(Config.ADMIN_ROLE): discord.PermissionOverwrite(read_messages=True)
-                }
+                overwrites=closed_overwrites(guild, settings)
             )
         
         # Embed de fechamento
@@ -224,27 +272,100 @@ class CloseTicketModal(discord.ui.Modal, title="Fechar Ticket"):
         await interaction.channel.send(embed=embed)
         
         # Log
-        log_channel = guild.get_channel(Config.TICKET_LOG_CHANNEL)
-        if log_channel:
-            log_embed = discord.Embed(
-                title="🔒 Ticket Fechado",
-                color=Config.COLORS['warning']
-            )
-            log_embed.add_field(name="ID", value=self.ticket_id)
-            log_embed.add_field(name="Moderador", value=interaction.user.mention)
-            log_embed.add_field(name="Motivo", value=self.reason.value or "Não especificado")
-            await log_channel.send(embed=log_embed)
+        log_embed = discord.Embed(
+            title="🔒 Ticket Fechado",
+            color=Config.COLORS['warning']
+        )
+        log_embed.add_field(name="ID", value=self.ticket_id)
+        log_embed.add_field(name="Moderador", value=interaction.user.mention)
+        log_embed.add_field(name="Motivo", value=self.reason.value or "Não especificado")
+        interaction.client.log_dispatcher.send(settings.get(guild.id, 'ticket_log_channel'), log_embed)
         
         await interaction.followup.send("✅ Ticket fechado com sucesso!", ephemeral=True)
 
 class TicketSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.capture = MessageCapture(bot.db)
+        self.ticket_channels = {}  # channel_id -> ticket_id (None = não é ticket)
+        self._backfill = None
+    
+    async def cog_load(self):
+        await asyncio.gather(setup_settings(self.bot), self.bot.ticket_index.load())
+        self.capture.start()
+        
+        # Views persistentes: o painel de abertura e os botões de todos os tickets
+        self.bot.add_view(TicketView())
+        self.bot.add_dynamic_items(TicketActionButton)
+    
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(TicketActionButton)
+        if self._backfill:
+            self._backfill.cancel()
+        await self.capture.stop()
+    
+    async def get_channel_ticket(self, channel_id):
+        """ID do ticket associado a um canal, com cache (inclusive negativo)"""
+        if channel_id not in self.ticket_channels:
+            self.ticket_channels[channel_id] = await self.bot.db.get_channel_ticket_id(channel_id)
+        return self.ticket_channels[channel_id]
+    
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if not message.guild:
+            return
+        
+        ticket_id = await self.get_channel_ticket(message.channel.id)
+        if ticket_id:
+            self.capture.add(ticket_id, message)
+    
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        if 'content' not in payload.data or not payload.guild_id:
+            return
+        
+        if await self.get_channel_ticket(payload.channel_id):
+            self.capture.edit(payload.message_id, payload.data['content'])
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        if not payload.guild_id:
+            return
+        
+        if await self.get_channel_ticket(payload.channel_id):
+            self.capture.delete(payload.message_id)
     
     @commands.Cog.listener()
     async def on_ready(self):
-        # Registrar views persistentes
-        self.bot.add_view(TicketView())
+        await self.bot.ticket_pool.start()
+        # Uma vez por processo: mensagens enviadas enquanto o bot estava fora do ar
+        if self._backfill is None:
+            self._backfill = asyncio.create_task(self.backfill_open_tickets())
+    
+    async def backfill_open_tickets(self):
+        """Captura do histórico as mensagens dos tickets abertos que faltam no banco"""
+        total = 0
+        for row in await self.bot.db.get_captured_open_tickets(shard_scope(self.bot)):
+            channel = self.bot.get_channel(row['channel_id'])
+            if not channel:
+                continue
+            try:
+                total += await self.capture.backfill(row['ticket_id'], channel, row['last_message_id'])
+            except discord.HTTPException as e:
+                logger.warning(f"Falha ao recuperar o histórico do ticket {row['ticket_id']}: {e}")
+        
+        await self.capture.flush()
+        if total:
+            logger.info(f"{total} mensagens de tickets recuperadas do histórico")
+    
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.bot.ticket_pool.refill(guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.ticket_channels.pop(channel.id, None)
+        self.bot.ticket_pool.discard(channel)
     
     @commands.command(name="setup-tickets")
     @commands.has_permissions(administrator=True)
@@ -268,7 +389,7 @@ class TicketSystem(commands.Cog):
         await ctx.message.delete()
     
     @commands.command(name="add-user")
-    @commands.has_role(Config.SUPPORT_ROLE)
+    @guild_role('support_role')
     async def add_user_to_ticket(self, ctx, member: discord.Member):
         """Adiciona um usuário ao ticket atual"""
         await ctx.channel.set_permissions(member, read_messages=True, send_messages=True)
@@ -279,7 +400,7 @@ class TicketSystem(commands.Cog):
         await ctx.send(embed=embed)
     
     @commands.command(name="remove-user")
-    @commands.has_role(Config.SUPPORT_ROLE)
+    @guild_role('support_role')
     async def remove_user_from_ticket(self, ctx, member: discord.Member):
         """Remove um usuário do ticket atual"""
         await ctx.channel.set_permissions(member, overwrite=None)
@@ -294,22 +415,30 @@ class TicketSystem(commands.Cog):
         """Mostra informações sobre o ticket atual"""
         db = self.bot.db
         
-        # Extrair ID do ticket do nome do canal
-        if ctx.channel.name.startswith("ticket-"):
-            ticket_id = ctx.channel.name.split("-")[1]
+        # O Discord deixa nomes de canais em minúsculas; buscar o ticket pelo canal
+        ticket_id = await self.get_channel_ticket(ctx.channel.id)
+        if ticket_id:
             ticket = await db.get_ticket(ticket_id)
             
             if ticket:
-                user = await self.bot.fetch_user(ticket['user_id'])
-                closed_by = await self.bot.fetch_user(ticket['closed_by']) if ticket['closed_by'] else None
+                users = await self.bot.resolver.resolve_many(
+                    [ticket['user_id'], ticket['closed_by']], ctx.guild
+                )
+                user = users.get(ticket['user_id'])
+                closed_by = users.get(ticket['closed_by'])
                 
                 embed = discord.Embed(
                     title=f"Informações do Ticket #{ticket_id}",
                     color=Config.COLORS['info']
                 )
-                embed.add_field(name="Criado por", value=f"{user.mention}\n({user.id})")
+                embed.add_field(name="Criado por", value=f"{user.mention if user else 'Desconhecido'}\n({ticket['user_id']})")
                 embed.add_field(name="Status", value=ticket['status'].upper())
                 embed.add_field(name="Categoria", value=ticket['category'])
+                
+                await self.capture.flush()
+                stats = await db.get_ticket_message_stats(ticket_id)
+                embed.add_field(name="Mensagens", value=stats['messages'])
+                embed.add_field(name="Participantes", value=stats['participants'])
                 embed.add_field(name="Criado em", value=discord.utils.format_dt(
                     datetime.fromisoformat(ticket['created_at']), 'F'
                 ))
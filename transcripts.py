@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import html
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime
+from config import Config
+
+# Quantidade de mensagens acumuladas antes de cada escrita no arquivo
+CHUNK_SIZE = 200
+
+HTML_HEADER = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Ticket {ticket_id}</title>
+<style>body{{font-family:sans-serif}} .m{{margin:4px 0}} .a{{font-weight:bold}} .t{{color:#888;font-size:small}}</style>
+</head><body><h1>Ticket #{ticket_id}</h1>
+"""
+HTML_FOOTER = "</body></html>\n"
+
+class TranscriptWriter:
+    """Escreve a transcrição incrementalmente em um arquivo temporário
+    
+    Todos os métodos são bloqueantes e devem rodar numa thread de trabalho.
+    """
+    
+    def __init__(self, ticket_id, fmt=None, compress=None):
+        self.ticket_id = ticket_id
+        self.fmt = fmt or Config.TRANSCRIPT_FORMAT
+        self.compress = Config.TRANSCRIPT_GZIP if compress is None else compress
+        
+        suffix = '.html' if self.fmt == 'html' else '.txt'
+        if self.compress:
+            suffix += '.gz'
+        self.filename = f"transcript_{ticket_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
+        
+        fd, self.path = tempfile.mkstemp(prefix=f"transcript_{ticket_id}_", suffix=suffix)
+        os.close(fd)
+        self._file = None
+        self.count = 0
+    
+    def open(self):
+        if self.compress:
+            self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+        
+        if self.fmt == 'html':
+            self._file.write(HTML_HEADER.format(ticket_id=html.escape(self.ticket_id)))
+    
+    def write(self, rows):
+        """Renderiza e grava um lote de (autor, autor_id, data, conteúdo)"""
+        if self.fmt == 'html':
+            lines = (
+                f'<div class="m"><span class="a">{html.escape(author)}</span> '
+                f'<span class="t">({author_id}) {created_at}</span><br>'
+                f'{html.escape(content or "")}</div>\n'
+                for author, author_id, created_at, content in rows
+            )
+        else:
+            lines = (
+                f"{author} ({author_id}) [{created_at}]: {content}\n"
+                for author, author_id, created_at, content in rows
+            )
+        self._file.writelines(lines)
+        self.count += len(rows)
+    
+    def close(self):
+        if self._file:
+            if self.fmt == 'html':
+                self._file.write(HTML_FOOTER)
+            self._file.close()
+            self._file = None
+    
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+async def history_rows(channel):
+    """Itera o histórico do canal (paginado pelo discord.py) como tuplas simples"""
+    async for message in channel.history(limit=None, oldest_first=True):
+        yield message.author.name, message.author.id, message.created_at, message.content
+
+async def stored_rows(db, ticket_id, page_size=1000):
+    """Itera as mensagens capturadas no banco, paginando por id"""
+    after_id = 0
+    while True:
+        page = await db.get_ticket_messages(ticket_id, after_id, page_size)
+        for row in page:
+            content = row['message']
+            if row['deleted_at']:
+                content = f"[apagada em {row['deleted_at']}] {content}"
+            elif row['edited_at']:
+                content = f"{content} (editada)"
+            yield row['author_name'] or str(row['user_id']), row['user_id'], row['timestamp'], content
+        
+        if len(page) < page_size:
+            break
+        after_id = page[-1]['id']
+
+@asynccontextmanager
+async def transcript_file(rows, ticket_id, fmt=None, compress=None):
+    """Gera a transcrição a partir de um iterador assíncrono de linhas
+    
+    O arquivo temporário é removido ao sair do bloco `async with`. Retorna
+    o `TranscriptWriter`, com `path` e `filename` para o upload.
+    """
+    writer = TranscriptWriter(ticket_id, fmt, compress)
+    try:
+        await asyncio.to_thread(writer.open)
+        
+        chunk = []
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                await asyncio.to_thread(writer.write, chunk)
+                chunk = []
+        if chunk:
+            await asyncio.to_thread(writer.write, chunk)
+        
+        await asyncio.to_thread(writer.close)
+        yield writer
+    finally:
+        await asyncio.to_thread(writer.remove)
@@ -2,34 +2,87 @@ import discord
 from discord.ext import commands, tasks
 from datetime import datetime, timedelta
 import asyncio
+import logging
 from config import Config
+from guild_settings import setup_settings, guild_role
+from sharding import shard_scope
+
+logger = logging.getLogger(__name__)
 
 class Utilities(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.cleanup_tickets.change_interval(minutes=Config.CLEANUP_INTERVAL_MINUTES)
         self.cleanup_tickets.start()
     
+    async def cog_load(self):
+        await setup_settings(self.bot)
+    
     def cog_unload(self):
         self.cleanup_tickets.cancel()
     
+    async def purge_ticket_channel(self, ticket, semaphore):
+        """Apaga o canal de um ticket; retorna se o ticket pode ser marcado como limpo"""
+        guild = self.bot.get_guild(ticket['guild_id']) if ticket['guild_id'] else None
+        channel = self.bot.get_channel(ticket['channel_id'])
+        
+        if not channel:
+            # Canal já não existe; se o servidor está indisponível, tentar de novo depois
+            return not (guild and guild.unavailable)
+        
+        async with semaphore:
+            try:
+                await channel.delete(reason="Ticket antigo - limpeza automática")
+                return True
+            except discord.NotFound:
+                return True
+            except discord.HTTPException as e:
+                logger.warning(f"Falha ao apagar o canal do ticket {ticket['ticket_id']}: {e}")
+                return False
+    
     @tasks.loop(hours=24)
     async def cleanup_tickets(self):
         """Limpa tickets antigos automaticamente"""
-        with self.bot.db.get_connection() as conn:
-            cursor = conn.execute('''
-                SELECT * FROM tickets 
-                WHERE status = 'closed' 
-                AND closed_at < datetime('now', '-? days')
-            ''', (Config.AUTO_CLOSE_DAYS,))
-            old_tickets = cursor.fetchall()
-        
-        for ticket in old_tickets:
-            try:
-                channel = self.bot.get_channel(ticket['channel_id'])
-                if channel:
-                    await channel.delete(reason="Ticket antigo - limpeza automática")
-            except:
-                pass
+        semaphore = asyncio.Semaphore(Config.CLEANUP_CONCURRENCY)
+        purged = failed = 0
+        
+        while True:
+            tickets = await self.bot.db.get_purgeable_tickets(
+                Config.AUTO_CLOSE_DAYS, Config.CLEANUP_BATCH_SIZE, shard_scope(self.bot)
+            )
+            if not tickets:
+                break
+            
+            results = await asyncio.gather(*(self.purge_ticket_channel(t, semaphore) for t in tickets))
+            done = [t['ticket_id'] for t, ok in zip(tickets, results) if ok]
+            await self.bot.db.mark_tickets_purged(done)
+            
+            purged += len(done)
+            failed += len(tickets) - len(done)
+            logger.info(f"Limpeza de tickets: {purged} limpos, {failed} falhas até agora")
+            
+            # Lote sem progresso: os restantes ficam para a próxima execução
+            if not done or len(tickets) < Config.CLEANUP_BATCH_SIZE:
+                break
+    
+    @cleanup_tickets.before_loop
+    async def before_cleanup(self):
+        await self.bot.wait_until_ready()
+    
+    @commands.command(name="retention")
+    @commands.has_permissions(administrator=True)
+    async def retention(self, ctx, days: int):
+        """Define por quantos dias os tickets fechados são mantidos neste servidor"""
+        if days < 1:
+            await ctx.send("❌ O prazo deve ser de pelo menos 1 dia.")
+            return
+        
+        await self.bot.settings.set(ctx.guild.id, 'retention_days', days)
+        embed = discord.Embed(
+            description=f"🗑️ Tickets fechados serão removidos após {days} dias.",
+            color=Config.COLORS['success']
+        )
+        await ctx.send(embed=embed)
     
     @commands.command(name="ping")
     async def ping(self, ctx):
@@ -42,23 +95,12 @@ class Utilities(commands.Cog):
         await ctx.send(embed=embed)
     
     @commands.command(name="status")
-    @commands.has_role(Config.MOD_ROLE)
+    @guild_role('mod_role')
     async def status(self, ctx):
         """Mostra estatísticas do bot"""
-        with self.bot.db.get_connection() as conn:
-            # Tickets
-            cursor = conn.execute('SELECT COUNT(*) FROM tickets')
-            total_tickets = cursor.fetchone()[0]
-            
-            cursor = conn.execute('SELECT COUNT(*) FROM tickets WHERE status = "open"')
-            open_tickets = cursor.fetchone()[0]
-            
-            cursor = conn.execute('SELECT COUNT(*) FROM tickets WHERE status = "closed"')
-            closed_tickets = cursor.fetchone()[0]
-            
-            # Moderação
-            cursor = conn.execute('SELECT COUNT(*) FROM moderation')
-            total_cases = cursor.fetchone()[0]
+        db = self.bot.db
+        counters = await db.get_counters(ctx.guild.id)
+        hourly = await db.get_hourly_stats(ctx.guild.id, hours=24)
         
         embed = discord.Embed(
             title="📊 Estatísticas do Bot",
@@ -66,49 +108,66 @@ class Utilities(commands.Cog):
             timestamp=datetime.now()
         )
         embed.add_field(name="🎫 Tickets", 
-                       value=f"Total: {total_tickets}\n"
-                             f"Abertos: {open_tickets}\n"
-                             f"Fechados: {closed_tickets}",
+                       value=f"Total: {counters.get('tickets.total', 0)}\n"
+                             f"Abertos: {counters.get('tickets.open', 0)}\n"
+                             f"Fechados: {counters.get('tickets.closed', 0)}",
                        inline=True)
         
+        actions = "\n".join(
+            f"{metric.split('.', 1)[1].capitalize()}: {value}"
+            for metric, value in sorted(counters.items())
+            if metric.startswith('cases.') and metric != 'cases.total'
+        )
         embed.add_field(name="🛡️ Moderação",
-                       value=f"Total de casos: {total_cases}",
+                       value=f"Total de casos: {counters.get('cases.total', 0)}"
+                             + (f"\n{actions}" if actions else ""),
+                       inline=True)
+        
+        embed.add_field(name="🕐 Últimas 24h",
+                       value=f"Casos: {hourly.get('cases', 0)}\n"
+                             f"Tickets abertos: {hourly.get('tickets.opened', 0)}\n"
+                             f"Tickets fechados: {hourly.get('tickets.closed', 0)}",
                        inline=True)
         
         embed.add_field(name="🌐 Servidores",
                        value=f"{len(self.bot.guilds)} servidores",
                        inline=True)
         
+        resolver = getattr(self.bot, 'resolver', None)
+        if resolver:
+            cache = resolver.stats()
+            embed.add_field(name="👥 Cache de usuários",
+                           value=f"Acertos: {cache['hits']}\n"
+                                 f"Falhas: {cache['misses']}\n"
+                                 f"Em cache: {cache['cached']}",
+                           inline=True)
+        
+        pool = getattr(self.bot, 'ticket_pool', None)
+        if pool and pool.size > 0:
+            channels = pool.stats()
+            embed.add_field(name="📦 Pool de tickets",
+                           value=f"Livres: {channels['available']}\n"
+                                 f"Acertos: {channels['hits']}\n"
+                                 f"Falhas: {channels['misses']}",
+                           inline=True)
+        
         embed.set_footer(text=f"Bot: {self.bot.user.name}")
         
         await ctx.send(embed=embed)
     
     @commands.command(name="userinfo")
-    @commands.has_role(Config.MOD_ROLE)
+    @commands.guild_only()
     async def userinfo(self, ctx, member: discord.Member = None):
-        """Mostra informações de um usuário"""
+        """Mostra informações de um usuário (tickets e advertências só para moderadores)"""
         member = member or ctx.author
-        
-        with self.bot.db.get_connection() as conn:
-            # Tickets do usuário
-            cursor = conn.execute('''
-                SELECT COUNT(*) FROM tickets WHERE user_id = ?
-            ''', (member.id,))
-            ticket_count = cursor.fetchone()[0]
-            
-            # Advertências
-            cursor = conn.execute('''
-                SELECT COUNT(*) FROM moderation 
-                WHERE user_id = ? AND action = 'warn' AND active = true
-            ''', (member.id,))
-            warning_count = cursor.fetchone()[0]
+        is_mod = self.bot.settings.has_role(ctx.author, 'mod_role')
         
         embed = discord.Embed(
             title=f"👤 Informações de {member.name}",
             color=member.color,
             timestamp=datetime.now()
         )
-        embed.set_thumbnail(url=member.avatar.url)
+        embed.set_thumbnail(url=member.display_avatar.url)
         
         embed.add_field(name="ID", value=member.id, inline=True)
         embed.add_field(name="Conta criada", 
@@ -123,8 +182,10 @@ class Utilities(commands.Cog):
                        value=" ".join(roles) if roles else "Nenhum cargo",
                        inline=False)
         
-        embed.add_field(name="🎫 Tickets", value=ticket_count, inline=True)
-        embed.add_field(name="⚠️ Advertências", value=warning_count, inline=True)
+        if is_mod:
+            ticket_count, warning_count = await self.bot.db.get_user_stats(ctx.guild.id, member.id)
+            embed.add_field(name="🎫 Tickets", value=ticket_count, inline=True)
+            embed.add_field(name="⚠️ Advertências", value=warning_count, inline=True)
         embed.add_field(name="📊 Status", 
                        value=f"Online: {'✅' if member.status == discord.Status.online else '❌'}\n"
                              f"Mobile: {'✅' if member.is_on_mobile() else '❌'}",